@@ -1,21 +1,52 @@
 #!/usr/bin/env python3
 
-import os, argparse, pathlib, glob
-import doc_globals
+import os, argparse, pathlib, cProfile
+import concurrent.futures
 
 from sys import stdout, stderr
 from enums import DefType
-from marker import Marker
 from doc_def import DocDef
+from doc_session import DocSession
+from doc_db import DocDB
+from doc_cache import DocCache
+from scanner import Scanner
+from walker import Walker
+from profiler import Profiler
 from parser import Parser
-from html_writer import HTMLWriter
-from doxygen_writer import DoxygenWriter
+from html_writer import HTMLWriter, HTMLSink
+from doxygen_writer import DoxygenWriter, DoxygenSink
+from json_writer import JSONWriter, JSONSink
+from doc_visitor import DocVisitor
+from ref_graph import RefGraph
+from doc_server import DocServer
+from doc_check import DocCheck
+from watch import Watch
+from pipeline import Pipeline
+from compressor import OutputCompressor
 
-arg_parser = argparse.ArgumentParser(prog = 'docgen')
+arg_parser = argparse.ArgumentParser(
+  prog = 'docgen',
+  epilog = 'Run "docgen serve -i PATH" to browse the reference from a local server, which updates as the files change. ' +
+    'Run "docgen merge -i MODEL... -o PATH" to write the documentation for several models written by --write-db.'
+)
 arg_parser.add_argument(
   '-i', '--input',
   nargs = '*',
-  help = 'The input files, or path to a directory containing the files'
+  help = 'The input files, or path to a directory containing the files. ' +
+    'Use @path to read a list of files, or pass a compile_commands.json'
+)
+arg_parser.add_argument(
+  '--from-db',
+  help='Read a model written by --write-db instead of parsing input files',
+  type = pathlib.Path,
+  metavar = 'PATH'
+)
+arg_parser.add_argument(
+  '--write-db',
+  help='Write the parsed model to a binary database at PATH, which can be read back with --from-db or merged. ' +
+    'Nothing else is written unless an output is given',
+  type = pathlib.Path,
+  metavar = 'PATH'
 )
 arg_parser.add_argument(
   '-o', '--output',
@@ -24,9 +55,129 @@ arg_parser.add_argument(
   type = pathlib.Path,
   default = stdout
 )
+arg_parser.add_argument(
+  '--html',
+  help='Write the HTML reference to this path (can be combined with --dox and --json)',
+  type = pathlib.Path,
+  metavar = 'PATH'
+)
 arg_parser.add_argument(
   '--dox', '--doxygen',
-  help='Generate documentation for Doxygen',
+  help='Generate documentation for Doxygen, into PATH or the output path',
+  nargs = '?',
+  type = pathlib.Path,
+  const = True,
+  default = False,
+  metavar = 'PATH'
+)
+arg_parser.add_argument(
+  '--json',
+  help='Write every definition as a line of JSON to this path',
+  type = pathlib.Path,
+  metavar = 'PATH'
+)
+arg_parser.add_argument(
+  '--split',
+  help='Write the HTML reference as an index page plus one page per namespace into the output path',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--search',
+  help='Write a prebuilt search index and a search box into the HTML reference',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--referenced-by',
+  help='List what refers to each definition in the HTML reference',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--check',
+  help='Write description coverage and lint problems as JSON to the output path, instead of any documentation',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--min-coverage',
+  help='With --check, fail if less than this percentage of definitions have descriptions',
+  type = float,
+  metavar = 'PERCENT'
+)
+arg_parser.add_argument(
+  '--max-problems',
+  help='With --check, fail if there are more than N lint problems, not counting missing descriptions',
+  type = int,
+  metavar = 'N'
+)
+arg_parser.add_argument(
+  '--compact',
+  help='Write smaller HTML, styled with classes instead of inline styles, and without indentation',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--short-anchors',
+  help='Use short ids made from a hash of each anchor, instead of Reference_<type>_<name>',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--compress',
+  help='Also write .gz copies of the HTML, CSS and search files, plus .br and .zst copies if brotli or zstandard is installed',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--cache-dir',
+  help='The directory where parsed files are cached between runs',
+  type = pathlib.Path,
+  default = pathlib.Path('.docgen_cache')
+)
+arg_parser.add_argument(
+  '--no-cache',
+  help='Parse every input file, ignoring and not updating the cache',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '-x', '--exclude',
+  help='Skip files and folders matching this pattern (can be repeated)',
+  action='append',
+  default=[]
+)
+arg_parser.add_argument(
+  '--ext',
+  help=f'Read files with this extension in input folders (can be repeated, default: {", ".join(Walker.DEFAULT_EXTENSIONS)})',
+  action='append'
+)
+arg_parser.add_argument(
+  '-j', '--jobs',
+  help='The number of processes used to parse input files and render Doxygen files, or 0 to use every CPU',
+  type = int,
+  default = 1
+)
+arg_parser.add_argument(
+  '--profile',
+  help='Report how long each phase, writer section and the N slowest input files took',
+  nargs = '?',
+  type = int,
+  const = 10,
+  metavar = 'N'
+)
+arg_parser.add_argument(
+  '--profile-dump',
+  help='With --profile, also write PREFIX.pstats and a Chrome trace to PREFIX.trace.json',
+  metavar = 'PREFIX'
+)
+arg_parser.add_argument(
+  '--watch',
+  help='Keep running, and update the output whenever an input file changes',
+  action='store_true'
+)
+arg_parser.add_argument(
+  '--port',
+  help='The port "docgen serve" listens on (default: 8000)',
+  type = int,
+  default = 8000
+)
+arg_parser.add_argument(
+  '--poll',
+  help='With --watch, check for changes by polling instead of using inotify',
   action='store_true'
 )
 
@@ -35,71 +186,339 @@ def main(args, arg_count):
     arg_parser.print_help()
     return
 
+  command = None
+  if args[1] == 'serve' or args[1] == 'merge':
+    command = args[1]
+    args = args[:1] + args[2:]
+
+  serving = command == 'serve'
+  merging = command == 'merge'
+
   parsed_args = arg_parser.parse_args(args[1:])
 
   input_paths = parsed_args.input
   output_file = parsed_args.output
 
-  doc_globals.init()
+  profile = None
+  if parsed_args.profile is not None:
+    Profiler.enable()
+    if parsed_args.profile_dump:
+      profile = cProfile.Profile()
+      profile.enable()
 
-  read_docs(input_paths)
-  process_docs(doc_globals.lists)
-  write_docs(output_file, parsed_args)
+  jobs = parsed_args.jobs
+  if jobs < 1:
+    jobs = os.cpu_count() or 1
 
-def read_file(file):
-  is_parsing_doc = False
-  doc_def = None
-  doc_lines = []
+  walker = Walker(parsed_args.ext, parsed_args.exclude)
 
-  for line_in_file in file:
-    line = line_in_file.strip()
+  if parsed_args.watch and stdout in get_output_paths(output_file, parsed_args):
+    raise ValueError("Must specify output path when watching for changes")
 
-    if line.startswith(Marker.DEF_START):
-      is_parsing_doc = True
-      continue
-    elif line.startswith(Marker.DEF_END):
-      doc_def = Parser.parse_doc_lines(doc_lines)
-      doc_lines.clear()
-      is_parsing_doc = False
+  if parsed_args.check:
+    if parsed_args.watch or serving:
+      raise ValueError("Can't check the documentation while watching for changes")
+    if parsed_args.html or parsed_args.dox or parsed_args.json:
+      raise ValueError("Can't write documentation while checking it")
 
-    if doc_def:
-      DocDef.add(doc_def)
-      doc_def = None
-    elif is_parsing_doc:
-      doc_lines.append(line)
-
-def read_docs(input_paths):
-  for path in input_paths:
-    if os.path.isdir(path):
-      open_and_read_files_in_folder(path)
+  if merging:
+    if not input_paths:
+      raise ValueError("Must specify the models to merge")
+    if parsed_args.from_db or parsed_args.watch:
+      raise ValueError("Can't read from a database or watch for changes when merging")
+
+  if serving:
+    if not input_paths and not parsed_args.from_db:
+      raise ValueError("Must specify input files or a database to serve")
+    if output_file != stdout or parsed_args.html or parsed_args.dox or parsed_args.json:
+      raise ValueError("Can't write output files while serving")
+
+  file_defs = None
+
+  if parsed_args.from_db:
+    if input_paths:
+      raise ValueError("Must specify either input files or a database to read from, not both")
+    if parsed_args.watch:
+      raise ValueError("Can't watch for changes when reading from a database")
+
+    # The database holds the model as it was after processing, so it can go straight to the writers
+    with DocDB.open(parsed_args.from_db) as db:
+      session = db.load_session()
+      if parsed_args.write_db:
+        order = db.get_ordered_docs()
+
+    # Copied with its read order, so it still merges like the original
+    if parsed_args.write_db:
+      DocDB.write(session, parsed_args.write_db, order)
+  elif merging:
+    if parsed_args.write_db or parsed_args.check:
+      file_defs = {}
+
+    # Each model is a shard of the inputs, in the order a single run would read them
+    with Profiler.section("merge"):
+      session = DocDB.merge(input_paths, file_defs)
+
+    with Profiler.section("process"):
+      process_docs(session.lists)
+
+    if parsed_args.write_db:
+      DocDB.write(session, parsed_args.write_db, get_read_order(file_defs))
+  else:
+    if parsed_args.watch or serving or parsed_args.check or parsed_args.write_db:
+      file_defs = {}
+
+    cache = None
+    if not parsed_args.no_cache:
+      cache = DocCache.load(parsed_args.cache_dir)
+
+    session = DocSession()
+    read_docs(session, input_paths, cache, jobs, walker, file_defs)
+
+    if cache:
+      cache.save()
+
+    with Profiler.section("process"):
+      process_docs(session.lists)
+
+    if parsed_args.write_db:
+      DocDB.write(session, parsed_args.write_db, get_read_order(file_defs))
+
+  # References are resolved once here, and kept up to date while watching
+  with Profiler.section("refs"):
+    session.refs = RefGraph.build(session)
+
+  # Checking doesn't need any writer
+  if parsed_args.check:
+    with Profiler.section("check"):
+      report = DocCheck(session, file_defs).run(parsed_args.min_coverage, parsed_args.max_problems)
+
+    if output_file == stdout:
+      DocCheck.write(report, output_file)
     else:
-      open_and_read_file(path)
+      with output_file.open(mode='w', encoding = 'utf-8') as file:
+        DocCheck.write(report, file)
 
-def open_and_read_file(path):
-  with open(path) as file:
-    read_file(file)
+    if parsed_args.profile is not None:
+      Profiler.report(parsed_args.profile)
 
-def open_and_read_files_in_folder(path):
-  for filename in glob.glob(path + "/**/*.cpp", recursive=True):
-    open_and_read_file(filename)
+    for failure in report["failures"]:
+      stderr.write(f"docgen: {failure}\n")
+
+    return 0 if report["passed"] else 1
+
+  # A model written to be merged later is all a shard needs, and its references may point into other shards
+  writes_docs = not serving
+  if parsed_args.write_db and output_file == stdout and not (parsed_args.html or parsed_args.dox or parsed_args.json):
+    writes_docs = False
+
+  if writes_docs or serving:
+    session.refs.report_dangling()
+
+  html_writer = HTMLWriter(session, parsed_args.search, parsed_args.referenced_by, parsed_args.compact, parsed_args.short_anchors)
+  if parsed_args.compress:
+    html_writer.compressor = OutputCompressor(jobs)
+
+  if writes_docs:
+    with Profiler.section("write"):
+      write_docs(session, output_file, parsed_args, jobs, html_writer)
+
+  if parsed_args.profile is not None:
+    if profile:
+      profile.disable()
+      profile.dump_stats(parsed_args.profile_dump + ".pstats")
+      Profiler.write_trace(parsed_args.profile_dump + ".trace.json")
+    Profiler.report(parsed_args.profile)
+
+  # Pages are only rendered when they're asked for
+  if serving:
+    watch = None
+    if file_defs is not None:
+      watch = Watch(session, input_paths, walker, file_defs, open_and_parse_file, None, parsed_args.poll)
+    DocServer(session, html_writer, parsed_args.port, watch).run()
+    return
+
+  if parsed_args.watch:
+    regenerate_fn = lambda namespaces, types: update_docs(session, output_file, parsed_args, jobs, html_writer, namespaces, types)
+    Watch(session, input_paths, walker, file_defs, open_and_parse_file, regenerate_fn, parsed_args.poll).run()
+
+def parse_file(file):
+  doc_defs = []
+
+  for line, doc_lines in Pipeline.split_blocks(file):
+    doc_def = Parser.parse_doc_lines(doc_lines)
+    if doc_def:
+      doc_defs.append(doc_def)
+
+  return doc_defs
+
+def read_file(session, file):
+  for doc_def in parse_file(file):
+    DocDef.add(session, doc_def)
+
+def read_docs(session, input_paths, cache = None, jobs = 1, walker = None, file_defs = None):
+  walker = walker or Walker()
+
+  if jobs > 1:
+    read_files_parallel(session, list(walker.find(input_paths)), cache, jobs, file_defs)
+    return
+
+  # Files are read as soon as the walker finds them
+  for path in walker.find(input_paths):
+    open_and_read_file(session, path, cache, file_defs)
+
+def open_and_read_file(session, path, cache = None, file_defs = None):
+  if cache is None:
+    doc_defs = open_and_parse_file_timed(path)
+  else:
+    doc_defs, miss = cache.lookup(path)
+    if miss:
+      doc_defs = open_and_parse_file_timed(path)
+      cache.store(path, miss, doc_defs)
+
+  if file_defs is not None:
+    file_defs[path] = doc_defs
+
+  for doc_def in doc_defs:
+    DocDef.add(session, doc_def)
+
+def open_and_parse_file(path):
+  # Only the doc blocks are decoded, and files without any are skipped
+  return parse_file(Scanner.scan_file(path))
+
+def open_and_parse_file_profiled(path):
+  return Profiler.time_file(path, Scanner.scan_file, parse_file)
+
+def open_and_parse_file_timed(path):
+  if not Profiler.enabled:
+    return open_and_parse_file(path)
+
+  doc_defs, timings = open_and_parse_file_profiled(path)
+  Profiler.add_file(path, len(doc_defs), timings)
+  return doc_defs
+
+def read_files_parallel(session, paths, cache, jobs, file_defs = None):
+  results = [None] * len(paths)
+  misses = {}
+  sizes = {}
+
+  for index, path in enumerate(paths):
+    if cache is None:
+      sizes[index] = os.path.getsize(path)
+      continue
+
+    results[index], miss = cache.lookup(path)
+    if miss:
+      misses[index] = miss
+      sizes[index] = miss[0].st_size
+
+  # Largest files go first, so one big file doesn't hold up the end of the run
+  pending = sorted(sizes, key = lambda index: sizes[index], reverse = True)
+
+  parse_fn = open_and_parse_file
+  if Profiler.enabled:
+    parse_fn = open_and_parse_file_profiled
+
+  with concurrent.futures.ProcessPoolExecutor(max_workers = jobs) as executor:
+    futures = {}
+
+    for index in pending:
+      futures[index] = executor.submit(parse_fn, paths[index])
+
+    for index, future in futures.items():
+      results[index] = future.result()
+      if Profiler.enabled:
+        results[index], timings = results[index]
+        Profiler.add_file(paths[index], len(results[index]), timings)
+      if index in misses:
+        cache.store(paths[index], misses[index], results[index])
+
+  # Merge in input order, so the output matches a serial run
+  for path, doc_defs in zip(paths, results):
+    if file_defs is not None:
+      file_defs[path] = doc_defs
+    for doc_def in doc_defs:
+      DocDef.add(session, doc_def)
+
+def get_read_order(file_defs):
+  return [doc_def for doc_defs in file_defs.values() for doc_def in doc_defs]
 
 def process_docs(lists):
   # Sort namespace and enum lists alphabetically
   for type in DefType:
-      if type == DefType.FUNCTION or type == DefType.METHOD or type == DefType.ENUM:
+      if DefType.has_sorted_namespaces(type):
         lists[type.value].namespace_list.sort()
 
-def write_docs(output_file, parsed_args):
+def get_output_paths(output_file, parsed_args):
+  dox_path = None
   if parsed_args.dox == True:
-    if output_file == stdout or output_file.is_file():
+    dox_path = output_file
+  elif parsed_args.dox:
+    dox_path = parsed_args.dox
+
+  # The output path is the HTML reference, unless it's where Doxygen files go
+  html_path = parsed_args.html
+  if html_path is None and parsed_args.dox != True:
+    if output_file != stdout or (dox_path is None and parsed_args.json is None):
+      html_path = output_file
+
+  return html_path, dox_path, parsed_args.json
+
+def write_docs(session, output_file, parsed_args, jobs = 1, html_writer = None):
+  html_writer = html_writer or HTMLWriter(session, parsed_args.search, parsed_args.referenced_by, parsed_args.compact, parsed_args.short_anchors)
+  html_path, dox_path, json_path = get_output_paths(output_file, parsed_args)
+
+  sinks = []
+
+  if dox_path is not None:
+    if dox_path == stdout or dox_path.is_file():
       raise ValueError("Must specify path (not file) when exporting Doxygen documentation")
-    DoxygenWriter.generate_files(output_file)
-  elif output_file == stdout:
-    HTMLWriter.generate_doc_file(output_file)
+    dox_path.mkdir(parents = True, exist_ok = True)
+    sinks.append(DoxygenSink(session, dox_path, jobs))
+
+  if html_path is not None:
+    if parsed_args.split == True:
+      if html_path == stdout or html_path.is_file():
+        raise ValueError("Must specify path (not file) when splitting HTML documentation into pages")
+    elif html_path == stdout:
+      if parsed_args.search:
+        raise ValueError("Must specify output file when generating a search index")
+      if parsed_args.compress:
+        raise ValueError("Must specify output file when writing compressed copies")
+      if len(sinks) > 0 or json_path is not None:
+        raise ValueError("Must specify output file for HTML when writing several outputs")
+    sinks.append(HTMLSink(html_writer, html_path, parsed_args.split))
+
+  if json_path is not None:
+    sinks.append(JSONSink(JSONWriter(session), json_path))
+
+  # Several outputs share one pass over the model
+  if len(sinks) > 1:
+    DocVisitor(session, sinks).run()
+    return
+
+  # A single output is written straight from the model, so Doxygen files can still render in parallel
+  if dox_path is not None:
+    DoxygenWriter.generate_files(session, dox_path, jobs)
+  elif json_path is not None:
+    with open(json_path, 'w', encoding = 'utf-8') as file:
+      JSONWriter(session).generate_file(file)
+  elif parsed_args.split == True:
+    html_path.mkdir(parents = True, exist_ok = True)
+    html_writer.generate_pages(html_path)
+  elif html_path == stdout:
+    html_writer.generate_doc_file(html_path)
+  else:
+    html_writer.write_doc_file(html_path)
+
+def update_docs(session, output_file, parsed_args, jobs, html_writer, namespaces, types):
+  # Watch keeps the model sorted as it goes, so only the output has to follow
+  html_path, dox_path, json_path = get_output_paths(output_file, parsed_args)
+
+  if parsed_args.split == True and dox_path is None and json_path is None:
+    html_writer.generate_pages(html_path, namespaces, types)
   else:
-    with output_file.open(mode='w') as file:
-      HTMLWriter.generate_doc_file(file)
+    write_docs(session, output_file, parsed_args, jobs, html_writer)
 
 if __name__ == '__main__':
   from sys import argv, exit
-  main(argv, len(argv))
+  exit(main(argv, len(argv)))
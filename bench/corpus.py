@@ -0,0 +1,176 @@
+import os, random, argparse
+
+# Writes a synthetic source tree that uses every marker docgen understands
+
+WORDS = [
+  "sprite", "entity", "layer", "sound", "texture", "scene", "palette", "input",
+  "value", "index", "position", "camera", "shader", "buffer", "stream", "resource"
+]
+
+TYPES = ["Integer", "Decimal", "Number", "String", "Boolean", "Array", "Map"]
+
+class CorpusGenerator:
+  def __init__(self, files, blocks, namespaces, seed = 0):
+    self.files = files
+    self.blocks = blocks
+    self.namespaces = namespaces
+    self.rng = random.Random(seed)
+    self.namespace_names = self.make_namespace_names()
+    self.counter = 0
+
+    # The last function written in each namespace, so deprecation notes can point at a real one
+    self.last_functions = {}
+
+  def make_namespace_names(self):
+    names = []
+
+    for i in range(self.namespaces):
+      name = f"Namespace{i}"
+      # Every fourth namespace is nested inside the previous one
+      if i % 4 == 3:
+        name = f"{names[-1]}.Sub{i}"
+      names.append(name)
+
+    return names
+
+  def sentence(self, words = 8):
+    return " ".join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+  def description(self):
+    text = self.sentence()
+
+    if self.rng.random() < 0.5:
+      ref = self.rng.choice(self.namespace_names)
+      text += f" See <ref {ref}> for `details`."
+
+    # Some descriptions continue on the next line
+    if self.rng.random() < 0.3:
+      return text + " \\\n             " + self.sentence()
+
+    return text
+
+  def next_name(self, prefix):
+    self.counter += 1
+    return f"{prefix}{self.counter}"
+
+  def function_block(self, namespace):
+    name = self.next_name("Function")
+    lines = [f" * {namespace}.{name}", f" * \\desc {self.description()}"]
+
+    for i in range(self.rng.randint(0, 3)):
+      lines.append(f" * \\param arg{i} ({self.rng.choice(TYPES)}): The <param arg{i}> {self.rng.choice(WORDS)}.")
+
+    if self.rng.random() < 0.5:
+      lines.append(f" * \\paramOpt flags (Integer): Optional flags. (default: `0`)")
+
+    if self.rng.random() < 0.3:
+      lines.append(f" * \\return <ref {self.rng.choice(self.namespace_names)}> The {self.rng.choice(WORDS)}.")
+    else:
+      lines.append(f" * \\return {self.rng.choice(TYPES)} The {self.rng.choice(WORDS)}.")
+
+    last_function = self.last_functions.get(namespace)
+    if last_function is not None and self.rng.random() < 0.05:
+      lines.append(f" * \\deprecated Use <ref {last_function}> instead.")
+
+    self.last_functions[namespace] = f"{namespace}.{name}"
+
+    lines.append(f" * \\ns {namespace}")
+    return lines
+
+  def method_block(self, namespace):
+    lines = [f" * \\method {self.next_name('Method')}", f" * \\desc {self.description()}"]
+    lines.append(f" * \\param value ({self.rng.choice(TYPES)}): The value.")
+    lines.append(f" * \\return {self.rng.choice(TYPES)} The result.")
+    lines.append(f" * \\ns {namespace}")
+    return lines
+
+  def constructor_block(self, namespace):
+    return [
+      " * \\constructor",
+      f" * \\desc Creates a new {namespace}.",
+      f" * \\param {self.rng.choice(WORDS)} ({self.rng.choice(TYPES)}): The initial value.",
+      f" * \\ns {namespace}"
+    ]
+
+  def field_block(self, namespace):
+    marker = self.rng.choice(["field", "classfield"])
+    return [
+      f" * \\{marker} {self.next_name('Field')}",
+      f" * \\type <ref {self.rng.choice(TYPES)}>",
+      " * \\default 0",
+      f" * \\desc {self.description()}",
+      f" * \\ns {namespace}"
+    ]
+
+  def enum_block(self, namespace):
+    prefix = namespace.replace('.', '').upper()
+    return [f" * \\enum {prefix}_{self.next_name('VALUE')}", f" * \\desc {self.sentence()}"]
+
+  def constant_block(self, namespace):
+    return [
+      f" * \\constant {self.next_name('CONSTANT_')}",
+      f" * \\type {self.rng.choice(TYPES)}",
+      f" * \\desc {self.sentence()}"
+    ]
+
+  def global_block(self, namespace):
+    return [f" * \\global {self.next_name('Global')}", f" * \\desc {self.sentence()}"]
+
+  def description_block(self, namespace):
+    marker = "class" if '.' in namespace else "namespace"
+    return [f" * \\{marker} {namespace}", f" * \\desc {self.description()}"]
+
+  BLOCK_KINDS = [
+    (function_block, 40),
+    (method_block, 15),
+    (constructor_block, 3),
+    (field_block, 12),
+    (enum_block, 15),
+    (constant_block, 10),
+    (global_block, 5)
+  ]
+
+  def file_text(self, index):
+    kinds = [kind for kind, _ in CorpusGenerator.BLOCK_KINDS]
+    weights = [weight for _, weight in CorpusGenerator.BLOCK_KINDS]
+
+    text = f"#include \"Generated{index}.h\"\n\n"
+
+    namespace = self.namespace_names[index % len(self.namespace_names)]
+    if index < len(self.namespace_names):
+      blocks = [self.description_block(namespace)]
+    else:
+      blocks = []
+
+    for _ in range(self.blocks):
+      namespace = self.rng.choice(self.namespace_names)
+      kind = self.rng.choices(kinds, weights)[0]
+      blocks.append(kind(self, namespace))
+
+    for lines in blocks:
+      text += "/***\n" + "\n".join(lines) + "\n */\n"
+      text += f"VMValue {self.next_name('Native')}(int argCount, VMValue* args) {{\n    return NULL_VAL;\n}}\n\n"
+
+    return text
+
+  def write(self, path):
+    for index in range(self.files):
+      folder = os.path.join(path, f"Module{index % 8}")
+      os.makedirs(folder, exist_ok = True)
+
+      with open(os.path.join(folder, f"Generated{index}.cpp"), 'w') as file:
+        file.write(self.file_text(index))
+
+def main():
+  arg_parser = argparse.ArgumentParser(prog = 'bench.corpus')
+  arg_parser.add_argument('output', help = 'The folder to write the corpus into')
+  arg_parser.add_argument('--files', type = int, default = 200, help = 'The number of source files')
+  arg_parser.add_argument('--blocks', type = int, default = 50, help = 'The number of doc blocks per file')
+  arg_parser.add_argument('--namespaces', type = int, default = 40, help = 'The number of namespaces')
+  arg_parser.add_argument('--seed', type = int, default = 0, help = 'The random seed')
+  args = arg_parser.parse_args()
+
+  CorpusGenerator(args.files, args.blocks, max(args.namespaces, 1), args.seed).write(args.output)
+
+if __name__ == '__main__':
+  main()
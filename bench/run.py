@@ -0,0 +1,143 @@
+import sys, json, time, resource, tempfile, pathlib, argparse, statistics, importlib.util
+
+from doc_session import DocSession
+from markup import Markup
+from html_writer import HTMLWriter
+from doxygen_writer import DoxygenWriter
+
+PHASES = ["read_docs", "process_docs", "html", "doxygen"]
+
+def load_docgen():
+  # __main__.py can't be imported by name, so load it as a regular module
+  path = pathlib.Path(__file__).resolve().parent.parent / "__main__.py"
+  spec = importlib.util.spec_from_file_location("docgen", path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+def get_peak_rss():
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Linux reports kilobytes, macOS reports bytes
+  if sys.platform == 'darwin':
+    return peak
+  return peak * 1024
+
+def run_once(docgen, input_paths, output_path, jobs):
+  timings = {}
+
+  # Every run starts from an empty session and a cold render cache
+  session = DocSession()
+  Markup.clear_cache()
+
+  start = time.perf_counter()
+  docgen.read_docs(session, input_paths, None, jobs)
+  timings["read_docs"] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  docgen.process_docs(session.lists)
+  timings["process_docs"] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  with open(output_path / "docs.html", 'w') as file:
+    HTMLWriter(session).generate_doc_file(file)
+  timings["html"] = time.perf_counter() - start
+
+  # A fresh folder each time, so unchanged files aren't skipped
+  dox_path = pathlib.Path(tempfile.mkdtemp(dir = output_path))
+
+  start = time.perf_counter()
+  DoxygenWriter.generate_files(session, dox_path, jobs)
+  timings["doxygen"] = time.perf_counter() - start
+
+  definitions = sum(group.count for group in session.lists)
+
+  return timings, definitions
+
+def run(input_paths, repeat, jobs):
+  docgen = load_docgen()
+  samples = { phase: [] for phase in PHASES }
+
+  with tempfile.TemporaryDirectory() as output_dir:
+    for _ in range(repeat):
+      timings, definitions = run_once(docgen, input_paths, pathlib.Path(output_dir), jobs)
+      for phase in PHASES:
+        samples[phase].append(timings[phase])
+
+  return {
+    "definitions": definitions,
+    "repeat": repeat,
+    "jobs": jobs,
+    "phases": {
+      phase: {
+        "min": min(samples[phase]),
+        "median": statistics.median(samples[phase])
+      } for phase in PHASES
+    },
+    "total": sum(min(samples[phase]) for phase in PHASES),
+    "peak_rss": get_peak_rss()
+  }
+
+def compare(results, baseline, tolerance, min_change):
+  regressed = False
+
+  print(f"{'phase':<14}{'baseline':>12}{'current':>12}{'change':>10}")
+
+  for phase in PHASES + ["total"]:
+    if phase == "total":
+      old, new = baseline["total"], results["total"]
+    else:
+      old, new = baseline["phases"][phase]["min"], results["phases"][phase]["min"]
+
+    change = (new / old - 1.0) if old else 0.0
+    marker = ""
+
+    # Phases that only take a few milliseconds are mostly timer noise
+    if change > tolerance and new - old > min_change:
+      marker = "  slower"
+      regressed = True
+
+    print(f"{phase:<14}{old:>11.4f}s{new:>11.4f}s{change:>+9.1%}{marker}")
+
+  old_rss, new_rss = baseline["peak_rss"], results["peak_rss"]
+  print(f"{'peak_rss':<14}{old_rss / 1048576:>10.1f}MB{new_rss / 1048576:>10.1f}MB")
+
+  return regressed
+
+def print_results(results):
+  print(f"{results['definitions']} definitions, best of {results['repeat']}")
+  for phase in PHASES:
+    print(f"{phase:<14}{results['phases'][phase]['min']:>11.4f}s")
+  print(f"{'total':<14}{results['total']:>11.4f}s")
+  print(f"{'peak_rss':<14}{results['peak_rss'] / 1048576:>10.1f}MB")
+
+def main():
+  arg_parser = argparse.ArgumentParser(prog = 'bench.run')
+  arg_parser.add_argument('input', nargs = '+', help = 'The corpus files or folders to document')
+  arg_parser.add_argument('--repeat', type = int, default = 3, help = 'How many times to run each phase')
+  arg_parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'The number of parser processes')
+  arg_parser.add_argument('--output', type = pathlib.Path, help = 'Write the results to this JSON file')
+  arg_parser.add_argument('--baseline', type = pathlib.Path, help = 'Compare the results against this JSON file')
+  arg_parser.add_argument('--tolerance', type = float, default = 0.1, help = 'How much slower a phase may get before it counts as a regression')
+  arg_parser.add_argument('--min-change', type = float, default = 0.005, help = 'How many seconds slower a phase must get to count as a regression')
+  args = arg_parser.parse_args()
+
+  # A regression gate that can't find its baseline shouldn't pass
+  if args.baseline and not args.baseline.is_file():
+    arg_parser.error(f"baseline {args.baseline} doesn't exist")
+
+  results = run(args.input, max(args.repeat, 1), args.jobs)
+
+  if args.output:
+    with open(args.output, 'w') as file:
+      json.dump(results, file, indent = 2)
+
+  if args.baseline:
+    with open(args.baseline) as file:
+      baseline = json.load(file)
+    if compare(results, baseline, args.tolerance, args.min_change):
+      sys.exit(1)
+  else:
+    print_results(results)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,130 @@
+import os, json, gzip, hashlib
+import concurrent.futures
+
+from sys import stderr
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+# Writes compressed copies next to output files, so a static server can send them as they are
+class OutputCompressor:
+  FILENAME = ".docgen-compressed.json"
+  EXTENSIONS = [".gz", ".br", ".zst"]
+
+  def __init__(self, jobs = 1):
+    self.jobs = jobs
+    self.codecs = OutputCompressor.get_codecs()
+    self.executor = None
+    self.pending = []
+
+    # Digests of the files the copies were made from, per folder
+    self.old_digests = {}
+    self.digests = {}
+
+    self.written = 0
+    self.unchanged = 0
+
+  def compress_gzip(data):
+    # No timestamp, so the same input always gives the same file
+    return gzip.compress(data, compresslevel = 9, mtime = 0)
+
+  # The top brotli and zstandard levels take seconds per megabyte, which watch mode would pay on every change
+  def compress_brotli(data):
+    return brotli.compress(data, mode = brotli.MODE_TEXT, quality = 9)
+
+  def compress_zstandard(data):
+    return zstandard.ZstdCompressor(level = 15).compress(data)
+
+  def get_codecs():
+    codecs = [(".gz", OutputCompressor.compress_gzip)]
+    if brotli is not None:
+      codecs.append((".br", OutputCompressor.compress_brotli))
+    if zstandard is not None:
+      codecs.append((".zst", OutputCompressor.compress_zstandard))
+    return codecs
+
+  def get_digests(self, folder):
+    digests = self.digests.get(folder)
+    if digests is not None:
+      return digests
+
+    try:
+      with open(os.path.join(folder, OutputCompressor.FILENAME), 'r', encoding = 'utf-8') as file:
+        self.old_digests[folder] = json.load(file)
+    except (OSError, ValueError):
+      self.old_digests[folder] = {}
+
+    digests = dict(self.old_digests[folder])
+    self.digests[folder] = digests
+    return digests
+
+  def write_copy(path, data, compress_fn):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as file:
+      file.write(compress_fn(data))
+    os.replace(temp_path, path)
+
+  def add(self, path):
+    path = str(path)
+    folder, filename = os.path.split(path)
+
+    with open(path, 'rb') as file:
+      data = file.read()
+
+    digest = hashlib.sha1(data).hexdigest()
+    digests = self.get_digests(folder)
+    old_digest = self.old_digests[folder].get(filename)
+    digests[filename] = digest
+
+    if self.executor is None:
+      self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = max(self.jobs, len(self.codecs)))
+
+    compressed = False
+    for extension, compress_fn in self.codecs:
+      copy_path = path + extension
+      if digest == old_digest and os.path.isfile(copy_path):
+        continue
+
+      # zlib, brotli and zstandard let go of the GIL, so copies are made in parallel
+      self.pending.append(self.executor.submit(OutputCompressor.write_copy, copy_path, data, compress_fn))
+      compressed = True
+
+    if compressed:
+      self.written += 1
+    else:
+      self.unchanged += 1
+
+  def remove(self, path):
+    path = str(path)
+    folder, filename = os.path.split(path)
+
+    self.get_digests(folder).pop(filename, None)
+
+    for extension in OutputCompressor.EXTENSIONS:
+      try:
+        os.remove(path + extension)
+      except FileNotFoundError:
+        pass
+
+  def finish(self):
+    for future in self.pending:
+      future.result()
+    self.pending.clear()
+
+    for folder, digests in self.digests.items():
+      with open(os.path.join(folder, OutputCompressor.FILENAME), 'w', encoding = 'utf-8') as file:
+        json.dump(digests, file, indent = 0, sort_keys = True)
+      self.old_digests[folder] = dict(digests)
+
+  def report(self, file = stderr):
+    extensions = ", ".join(extension for extension, _ in self.codecs)
+    file.write(f"docgen: compressed {self.written} file(s) to {extensions}, {self.unchanged} unchanged\n")
+    self.written = 0
+    self.unchanged = 0
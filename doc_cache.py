@@ -0,0 +1,75 @@
+import os, pickle, hashlib
+
+from scanner import Scanner
+
+class DocCache:
+  FILENAME = "docgen.cache"
+  VERSION = 3
+
+  def __init__(self, path):
+    self.path = path
+    self.entries = {}
+    self.seen = {}
+
+  def load(path):
+    cache = DocCache(path)
+
+    try:
+      with open(path / DocCache.FILENAME, 'rb') as file:
+        version, entries = pickle.load(file)
+      if version == DocCache.VERSION:
+        cache.entries = entries
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError, AttributeError, ImportError):
+      pass
+
+    return cache
+
+  def save(self):
+    # Only files seen during this run are kept, so deleted files drop out
+    os.makedirs(self.path, exist_ok = True)
+
+    filename = self.path / DocCache.FILENAME
+    temp_filename = self.path / (DocCache.FILENAME + ".tmp")
+
+    with open(temp_filename, 'wb') as file:
+      pickle.dump((DocCache.VERSION, self.seen), file, protocol = pickle.HIGHEST_PROTOCOL)
+
+    os.replace(temp_filename, filename)
+
+  def get_key(path):
+    return os.path.abspath(path)
+
+  def get_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+  def get_file_digest(path):
+    with open(path, 'rb') as file:
+      data = Scanner.map_file(file)
+      if data is None:
+        return DocCache.get_digest(b"")
+
+      with data:
+        return DocCache.get_digest(data)
+
+  def lookup(self, path):
+    key = DocCache.get_key(path)
+    stat = os.stat(path)
+    entry = self.entries.get(key)
+
+    # Size and mtime match, so the file doesn't even need to be read
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+      self.seen[key] = entry
+      return entry[3], None
+
+    digest = DocCache.get_file_digest(path)
+
+    # Touched, but the contents are the same
+    if entry and entry[2] == digest:
+      self.seen[key] = (stat.st_size, stat.st_mtime_ns, digest, entry[3])
+      return entry[3], None
+
+    return None, (stat, digest)
+
+  def store(self, path, miss, doc_defs):
+    stat, digest = miss
+    self.seen[DocCache.get_key(path)] = (stat.st_size, stat.st_mtime_ns, digest, doc_defs)
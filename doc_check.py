@@ -0,0 +1,153 @@
+import json, collections
+
+from enums import DefType, defTypeNames
+
+# Description coverage and lint results, straight from the model
+class DocCheck:
+  MISSING_DESC = "missing-desc"
+  DUPLICATE_TITLE = "duplicate-title"
+  DANGLING_REF = "dangling-ref"
+
+  def __init__(self, session, file_defs = None):
+    self.session = session
+    self.problems = []
+    self.paths = {}
+
+    # Which file each definition came from, when that's known
+    for path, doc_defs in (file_defs or {}).items():
+      for doc_def in doc_defs:
+        self.paths[id(doc_def)] = str(path)
+
+  def get_coverage(documented, count):
+    percent = 100.0
+    if count > 0:
+      percent = round(documented * 100.0 / count, 2)
+
+    return { "documented": documented, "count": count, "percent": percent }
+
+  def count_docs(docs):
+    documented = 0
+    for doc_def in docs:
+      if doc_def.description is not None:
+        documented += 1
+    return documented, len(docs)
+
+  def get_type_coverage(self):
+    coverage = {}
+    total_documented = 0
+    total_count = 0
+
+    # Classes and namespaces are descriptions themselves, so they aren't counted
+    for type in DefType:
+      if DefType.is_descriptive(type):
+        continue
+
+      documented, count = DocCheck.count_docs(self.session.lists[type.value].doc_list)
+      if count == 0:
+        continue
+
+      coverage[defTypeNames[type][0]] = DocCheck.get_coverage(documented, count)
+      total_documented += documented
+      total_count += count
+
+    return DocCheck.get_coverage(total_documented, total_count), coverage
+
+  def get_namespace_coverage(self):
+    coverage = {}
+
+    for name in sorted(self.session.namespaces):
+      docs_per_def = self.session.namespaces[name].docs_per_def
+      documented = 0
+      count = 0
+
+      for type in DefType:
+        if not DefType.is_descriptive(type):
+          type_documented, type_count = DocCheck.count_docs(docs_per_def[type.value])
+          documented += type_documented
+          count += type_count
+
+      if count > 0:
+        coverage[name] = DocCheck.get_coverage(documented, count)
+
+    return coverage
+
+  def add_problem(self, doc_def, rule, message):
+    problem = {
+      "rule": rule,
+      "type": defTypeNames[doc_def.type][0],
+      "title": doc_def.get_title(),
+      "message": message
+    }
+
+    path = self.paths.get(id(doc_def))
+    if path is not None:
+      problem["path"] = path
+
+    self.problems.append(problem)
+
+  def check_docs(self):
+    for group in self.session.lists:
+      for doc_def in group.doc_list:
+        if doc_def.description is None and not DefType.is_descriptive(doc_def.type):
+          self.add_problem(doc_def, DocCheck.MISSING_DESC, "No \\desc")
+
+        for rule, message in doc_def.problems or ():
+          self.add_problem(doc_def, rule, message)
+
+  def check_titles(self):
+    titles = collections.defaultdict(list)
+
+    for group in self.session.lists:
+      for doc_def in group.doc_list:
+        titles[doc_def.get_title()].append(doc_def)
+
+    for title, docs in titles.items():
+      href = self.session.href.get(title)
+      # Overloaded constructors share their class's title and anchor on purpose
+      anchors = collections.Counter(doc_def.get_href() for doc_def in docs if doc_def.type != DefType.CONSTRUCTOR)
+
+      for doc_def in docs:
+        if anchors[doc_def.get_href()] > 1 and doc_def.type != DefType.CONSTRUCTOR:
+          self.add_problem(doc_def, DocCheck.DUPLICATE_TITLE, f"Defined more than once, so links to {title} only reach one of them")
+        elif doc_def.get_href() != href and not DefType.is_descriptive(doc_def.type) and doc_def.type != DefType.CONSTRUCTOR:
+          # A constructor is named after its class, which is meant to take the link
+          self.add_problem(doc_def, DocCheck.DUPLICATE_TITLE, f"Links to {title} go to {href} instead")
+
+  def check_refs(self):
+    for doc_def, name, where in self.session.refs.get_dangling():
+      self.add_problem(doc_def, DocCheck.DANGLING_REF, f"The {where} refers to {name}, which isn't documented")
+
+  def run(self, min_coverage = None, max_problems = None):
+    total, types = self.get_type_coverage()
+    namespaces = self.get_namespace_coverage()
+
+    self.check_docs()
+    self.check_titles()
+    self.check_refs()
+
+    rules = collections.Counter(problem["rule"] for problem in self.problems)
+
+    # Missing descriptions are what coverage measures, so they don't count as lint problems
+    lint_problems = len(self.problems) - rules[DocCheck.MISSING_DESC]
+
+    failures = []
+    if min_coverage is not None and total["percent"] < min_coverage:
+      failures.append(f"Coverage is {total['percent']}%, below {min_coverage}%")
+    if max_problems is not None and lint_problems > max_problems:
+      failures.append(f"Found {lint_problems} problems, more than {max_problems}")
+
+    return {
+      "passed": len(failures) == 0,
+      "failures": failures,
+      "coverage": {
+        "total": total,
+        "types": types,
+        "namespaces": namespaces
+      },
+      "rules": dict(sorted(rules.items())),
+      "problems": self.problems
+    }
+
+  def write(report, file):
+    json.dump(report, file, indent = 2, ensure_ascii = False)
+    file.write("\n")
@@ -0,0 +1,485 @@
+import os, sys, mmap, struct
+
+from sys import stderr
+
+from enums import DefType
+from doc_def import DocDef, FunctionDef, ParamDef, EnumDef, ConstantDef, FieldDef
+from doc_session import DocSession
+from namespace_info import NamespaceInfo
+
+# A parsed model in one file, laid out so it can be memory-mapped and read lazily.
+# Every string is stored once in the string table and referred to by index, and
+# every other section is an array of fixed-size entries.
+class DocDB:
+  MAGIC = b"DOCDB\r\n\x1a"
+  VERSION = 3
+
+  # Stands in for a missing string
+  NONE = 0xFFFFFFFF
+
+  HEADER = struct.Struct("<8sII")
+  SECTION = struct.Struct("<II")
+
+  # Sections, in the order they're listed in the header
+  STRING_OFFSETS = 0
+  STRING_DATA = 1
+  RECORDS = 2
+  PARAMS = 3
+  GROUPS = 4
+  GROUP_NAMESPACES = 5
+  NAMESPACES = 6
+  INDICES = 7
+  HREFS = 8
+  DESCRIPTIONS = 9
+  TITLES = 10
+  ORDER = 11
+  PROBLEMS = 12
+  SECTION_COUNT = 13
+
+  STRING_RANGE = struct.Struct("<II")
+  # kind, type, title, full title, description, deprecated, namespace, two type-specific strings, params, problems
+  RECORD = struct.Struct("<BB2x11I")
+  # text, label, description, type, default value, optional
+  PARAM = struct.Struct("<5IB3x")
+  # doc list range in RECORDS, namespace list range in GROUP_NAMESPACES
+  GROUP = struct.Struct("<4I")
+  # name, doc range in INDICES
+  GROUP_NAMESPACE = struct.Struct("<3I")
+  # name, flags, then a doc range in INDICES per DefType
+  NAMESPACE = struct.Struct(f"<2I{len(DefType) * 2}I")
+  INDEX = struct.Struct("<I")
+  # key string, then a string (HREFS, PROBLEMS) or a record (DESCRIPTIONS)
+  PAIR = struct.Struct("<2I")
+
+  IS_ENUM_NAMESPACE = 1
+
+  KINDS = (DocDef, FunctionDef, EnumDef, ConstantDef, FieldDef)
+
+  def __init__(self, data, file = None):
+    self.data = data
+    self.file = file
+
+    magic, version, section_count = DocDB.HEADER.unpack_from(data, 0)
+    if magic != DocDB.MAGIC:
+      raise ValueError("Not a docdb file")
+    if version != DocDB.VERSION or section_count != DocDB.SECTION_COUNT:
+      raise ValueError(f"Unsupported docdb version {version}")
+
+    self.sections = []
+    for i in range(section_count):
+      self.sections.append(DocDB.SECTION.unpack_from(data, DocDB.HEADER.size + i * DocDB.SECTION.size))
+
+    # Strings and definitions are only decoded when they're first asked for
+    self.strings = {}
+    self.docs = {}
+
+  def open(path):
+    file = open(path, 'rb')
+
+    try:
+      data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    except ValueError:
+      file.close()
+      raise ValueError(f"{path} is empty")
+
+    return DocDB(data, file)
+
+  def close(self):
+    self.strings.clear()
+    self.docs.clear()
+
+    if self.file is not None:
+      self.data.close()
+      self.file.close()
+      self.file = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+    return False
+
+  def get_count(self, section):
+    return self.sections[section][1]
+
+  def get_entry(self, section, entry_struct, index):
+    return entry_struct.unpack_from(self.data, self.sections[section][0] + index * entry_struct.size)
+
+  def get_string(self, index):
+    if index == DocDB.NONE:
+      return None
+
+    string = self.strings.get(index)
+    if string is None:
+      # Each string ends where the next one starts
+      offset = self.sections[DocDB.STRING_OFFSETS][0] + index * DocDB.INDEX.size
+      start, end = DocDB.STRING_RANGE.unpack_from(self.data, offset)
+      data_offset = self.sections[DocDB.STRING_DATA][0]
+      string = sys.intern(str(self.data[data_offset + start:data_offset + end], 'utf-8'))
+      self.strings[index] = string
+
+    return string
+
+  def get_indices(self, start, count):
+    offset = self.sections[DocDB.INDICES][0] + start * DocDB.INDEX.size
+    return struct.unpack_from(f"<{count}I", self.data, offset)
+
+  def get_param(self, index):
+    text, label, description, type, default_value, optional = self.get_entry(DocDB.PARAMS, DocDB.PARAM, index)
+
+    param = ParamDef.__new__(ParamDef)
+    param.text = self.get_string(text)
+    param.label = self.get_string(label)
+    param.description = self.get_string(description)
+    param.type = self.get_string(type)
+    param.default_value = self.get_string(default_value)
+    param.optional = bool(optional)
+
+    return param
+
+  def get_doc(self, index):
+    doc_def = self.docs.get(index)
+    if doc_def is not None:
+      return doc_def
+
+    entry = self.get_entry(DocDB.RECORDS, DocDB.RECORD, index)
+    kind, type, title, full_title, description, deprecated, namespace, extra0, extra1, params_start, params_count, problems_start, problems_count = entry
+
+    doc_def = DocDB.KINDS[kind]()
+    doc_def.type = DefType(type)
+    doc_def.title = self.get_string(title)
+    doc_def.description = self.get_string(description)
+    doc_def.deprecated = self.get_string(deprecated)
+    doc_def.namespace = self.get_string(namespace)
+
+    if isinstance(doc_def, FunctionDef):
+      doc_def.returns = self.get_string(extra0)
+      doc_def.return_type = self.get_string(extra1)
+      doc_def.params = [self.get_param(params_start + i) for i in range(params_count)]
+    elif isinstance(doc_def, EnumDef):
+      doc_def.prefix = self.get_string(extra0)
+    elif isinstance(doc_def, ConstantDef):
+      doc_def.value_type = self.get_string(extra0)
+      if isinstance(doc_def, FieldDef):
+        doc_def.default_value = self.get_string(extra1)
+
+    for i in range(problems_start, problems_start + problems_count):
+      rule, message = self.get_entry(DocDB.PROBLEMS, DocDB.PAIR, i)
+      doc_def.add_problem(self.get_string(rule), self.get_string(message))
+
+    doc_def.precompute()
+
+    self.docs[index] = doc_def
+    return doc_def
+
+  def get_full_title(self, index):
+    return self.get_string(self.get_entry(DocDB.RECORDS, DocDB.RECORD, index)[3])
+
+  def get_docs(self, type):
+    doc_start, doc_count, _, _ = self.get_entry(DocDB.GROUPS, DocDB.GROUP, type.value)
+    for index in range(doc_start, doc_start + doc_count):
+      yield self.get_doc(index)
+
+  def search(count, get_key, key):
+    low, high = 0, count
+
+    while low < high:
+      mid = (low + high) // 2
+      if get_key(mid) < key:
+        low = mid + 1
+      else:
+        high = mid
+
+    if low < count and get_key(low) == key:
+      return low
+
+    return None
+
+  def find_pair(self, section, key):
+    get_key = lambda index: self.get_string(self.get_entry(section, DocDB.PAIR, index)[0])
+
+    index = DocDB.search(self.get_count(section), get_key, key)
+    if index is None:
+      return None
+
+    return self.get_entry(section, DocDB.PAIR, index)[1]
+
+  def find_href(self, title):
+    href = self.find_pair(DocDB.HREFS, title)
+    if href is None:
+      return None
+
+    return self.get_string(href)
+
+  def find_description(self, title):
+    index = self.find_pair(DocDB.DESCRIPTIONS, title)
+    if index is None:
+      return None
+
+    return self.get_doc(index)
+
+  def find_doc(self, title):
+    get_record = lambda index: self.get_entry(DocDB.TITLES, DocDB.INDEX, index)[0]
+    get_key = lambda index: self.get_full_title(get_record(index))
+
+    index = DocDB.search(self.get_count(DocDB.TITLES), get_key, title)
+    if index is None:
+      return None
+
+    return self.get_doc(get_record(index))
+
+  def load_session(self):
+    session = DocSession()
+    docs = [self.get_doc(index) for index in range(self.get_count(DocDB.RECORDS))]
+
+    for type in DefType:
+      group = session.lists[type.value]
+      doc_start, doc_count, names_start, names_count = self.get_entry(DocDB.GROUPS, DocDB.GROUP, type.value)
+
+      group.doc_list = docs[doc_start:doc_start + doc_count]
+      group.count = doc_count
+
+      for i in range(names_start, names_start + names_count):
+        name, start, count = self.get_entry(DocDB.GROUP_NAMESPACES, DocDB.GROUP_NAMESPACE, i)
+        name = self.get_string(name)
+        group.namespaces[name] = [docs[index] for index in self.get_indices(start, count)]
+        group.namespace_list.append(name)
+
+    for i in range(self.get_count(DocDB.NAMESPACES)):
+      name, flags, *ranges = self.get_entry(DocDB.NAMESPACES, DocDB.NAMESPACE, i)
+
+      ns_info = NamespaceInfo()
+      ns_info.is_enum_namespace = bool(flags & DocDB.IS_ENUM_NAMESPACE)
+      ns_info.docs_per_def = {}
+
+      for type in DefType:
+        start, count = ranges[type.value * 2], ranges[type.value * 2 + 1]
+        ns_info.docs_per_def[type.value] = [docs[index] for index in self.get_indices(start, count)]
+
+      session.namespaces[self.get_string(name)] = ns_info
+
+    for i in range(self.get_count(DocDB.HREFS)):
+      title, href = self.get_entry(DocDB.HREFS, DocDB.PAIR, i)
+      session.href[self.get_string(title)] = self.get_string(href)
+
+    for i in range(self.get_count(DocDB.DESCRIPTIONS)):
+      title, index = self.get_entry(DocDB.DESCRIPTIONS, DocDB.PAIR, i)
+      session.descriptions[self.get_string(title)] = docs[index]
+
+    return session
+
+  def read_session(path):
+    with DocDB.open(path) as db:
+      return db.load_session()
+
+  def get_ordered_docs(self):
+    # Definitions in the order they were first read in
+    count = self.get_count(DocDB.ORDER)
+    indices = struct.unpack_from(f"<{count}I", self.data, self.sections[DocDB.ORDER][0])
+    return [self.get_doc(index) for index in indices]
+
+  def merge(paths, file_defs = None):
+    # Adding every definition again in the order a single run would have read them
+    # gives the same model as that run
+    session = DocSession()
+    first_path = {}
+    conflicts = set()
+
+    for path in paths:
+      with DocDB.open(path) as db:
+        doc_defs = db.get_ordered_docs()
+
+      for doc_def in doc_defs:
+        key = (doc_def.type, doc_def.get_title())
+        other_path = first_path.setdefault(key, path)
+        if other_path != path and not (key, path) in conflicts:
+          conflicts.add((key, path))
+          stderr.write(f"docgen: {doc_def.get_title()} is defined in both {other_path} and {path}\n")
+
+        DocDef.add(session, doc_def)
+
+      if file_defs is not None:
+        file_defs[path] = doc_defs
+
+    return session
+
+  def write(session, path, order = None):
+    DocDBWriter(session, order).write(path)
+
+class DocDBWriter:
+  def __init__(self, session, order = None):
+    self.session = session
+    self.order = order
+    self.string_ids = {}
+    self.string_data = bytearray()
+    self.string_offsets = [0]
+    self.records = bytearray()
+    self.params = bytearray()
+    self.problems = bytearray()
+    self.indices = []
+    self.record_ids = {}
+
+  def add_string(self, string):
+    if string is None:
+      return DocDB.NONE
+
+    index = self.string_ids.get(string)
+    if index is None:
+      index = len(self.string_offsets) - 1
+      self.string_ids[string] = index
+      self.string_data += string.encode('utf-8')
+      self.string_offsets.append(len(self.string_data))
+
+    return index
+
+  def add_indices(self, docs):
+    start = len(self.indices)
+    self.indices.extend(self.record_ids[id(doc_def)] for doc_def in docs)
+    return start, len(docs)
+
+  def add_param(self, param):
+    self.params += DocDB.PARAM.pack(
+      self.add_string(param.text),
+      self.add_string(param.label),
+      self.add_string(param.description),
+      self.add_string(param.type),
+      self.add_string(param.default_value),
+      1 if param.optional else 0
+    )
+
+  def add_record(self, doc_def):
+    extra0 = extra1 = DocDB.NONE
+    params_start = len(self.params) // DocDB.PARAM.size
+    params_count = 0
+
+    if isinstance(doc_def, FunctionDef):
+      extra0 = self.add_string(doc_def.returns)
+      extra1 = self.add_string(doc_def.return_type)
+      for param in doc_def.params:
+        self.add_param(param)
+      params_count = len(doc_def.params)
+    elif isinstance(doc_def, EnumDef):
+      extra0 = self.add_string(doc_def.prefix)
+    elif isinstance(doc_def, ConstantDef):
+      extra0 = self.add_string(doc_def.value_type)
+      if isinstance(doc_def, FieldDef):
+        extra1 = self.add_string(doc_def.default_value)
+
+    # What --check found while parsing, so a merged or loaded model reports it too
+    problems_start = len(self.problems) // DocDB.PAIR.size
+    for rule, message in doc_def.problems or ():
+      self.problems += DocDB.PAIR.pack(self.add_string(rule), self.add_string(message))
+    problems_count = len(self.problems) // DocDB.PAIR.size - problems_start
+
+    self.record_ids[id(doc_def)] = len(self.records) // DocDB.RECORD.size
+    self.records += DocDB.RECORD.pack(
+      DocDB.KINDS.index(type(doc_def)),
+      doc_def.type.value,
+      self.add_string(doc_def.title),
+      self.add_string(doc_def.get_title()),
+      self.add_string(doc_def.description),
+      self.add_string(doc_def.deprecated),
+      self.add_string(doc_def.namespace),
+      extra0,
+      extra1,
+      params_start,
+      params_count,
+      problems_start,
+      problems_count
+    )
+
+  def build_sections(self):
+    session = self.session
+
+    # Records are grouped by type, so each type's doc list is a single range
+    groups = bytearray()
+    group_namespaces = bytearray()
+
+    for type in DefType:
+      for doc_def in session.lists[type.value].doc_list:
+        self.add_record(doc_def)
+
+    record_start = 0
+    for type in DefType:
+      group = session.lists[type.value]
+      names_start = len(group_namespaces) // DocDB.GROUP_NAMESPACE.size
+
+      for name in group.namespace_list:
+        group_namespaces += DocDB.GROUP_NAMESPACE.pack(self.add_string(name), *self.add_indices(group.namespaces[name]))
+
+      groups += DocDB.GROUP.pack(record_start, len(group.doc_list), names_start, len(group.namespace_list))
+      record_start += len(group.doc_list)
+
+    namespaces = bytearray()
+    for name, ns_info in session.namespaces.items():
+      ranges = []
+      for type in DefType:
+        ranges.extend(self.add_indices(ns_info.docs_per_def[type.value]))
+
+      flags = DocDB.IS_ENUM_NAMESPACE if ns_info.is_enum_namespace else 0
+      namespaces += DocDB.NAMESPACE.pack(self.add_string(name), flags, *ranges)
+
+    # Lookup tables are sorted by key, so they can be binary searched in place
+    hrefs = bytearray()
+    for title in sorted(session.href):
+      hrefs += DocDB.PAIR.pack(self.add_string(title), self.add_string(session.href[title]))
+
+    descriptions = bytearray()
+    for title in sorted(session.descriptions):
+      descriptions += DocDB.PAIR.pack(self.add_string(title), self.record_ids[id(session.descriptions[title])])
+
+    record_count = len(self.records) // DocDB.RECORD.size
+    titles = sorted(range(record_count), key = self.get_record_title)
+
+    # Without a read order, definitions are listed by type
+    order = range(record_count)
+    if self.order is not None:
+      order = [self.record_ids[id(doc_def)] for doc_def in self.order]
+
+    return [
+      (struct.pack(f"<{len(self.string_offsets)}I", *self.string_offsets), len(self.string_offsets) - 1),
+      (bytes(self.string_data), len(self.string_data)),
+      (bytes(self.records), record_count),
+      (bytes(self.params), len(self.params) // DocDB.PARAM.size),
+      (bytes(groups), len(DefType)),
+      (bytes(group_namespaces), len(group_namespaces) // DocDB.GROUP_NAMESPACE.size),
+      (bytes(namespaces), len(session.namespaces)),
+      (struct.pack(f"<{len(self.indices)}I", *self.indices), len(self.indices)),
+      (bytes(hrefs), len(session.href)),
+      (bytes(descriptions), len(session.descriptions)),
+      (struct.pack(f"<{len(titles)}I", *titles), len(titles)),
+      (struct.pack(f"<{len(order)}I", *order), len(order)),
+      (bytes(self.problems), len(self.problems) // DocDB.PAIR.size)
+    ]
+
+  def get_record_title(self, index):
+    full_title = DocDB.RECORD.unpack_from(self.records, index * DocDB.RECORD.size)[3]
+    start, end = self.string_offsets[full_title], self.string_offsets[full_title + 1]
+    return self.string_data[start:end].decode('utf-8')
+
+  def write(self, path):
+    sections = self.build_sections()
+
+    # Sections start on 8 byte boundaries after the header and section table
+    offset = DocDB.HEADER.size + len(sections) * DocDB.SECTION.size
+    table = bytearray()
+    layout = []
+
+    for data, count in sections:
+      offset = (offset + 7) & ~7
+      table += DocDB.SECTION.pack(offset, count)
+      layout.append((offset, data))
+      offset += len(data)
+
+    temp_path = str(path) + ".tmp"
+
+    with open(temp_path, 'wb') as file:
+      file.write(DocDB.HEADER.pack(DocDB.MAGIC, DocDB.VERSION, len(sections)))
+      file.write(table)
+
+      for section_offset, data in layout:
+        file.write(b"\0" * (section_offset - file.tell()))
+        file.write(data)
+
+    os.replace(temp_path, path)
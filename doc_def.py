@@ -1,11 +1,14 @@
-import doc_globals
-
-import re
+import re, sys, bisect
 
 from enums import DefType, defTypeNames
 from namespace_info import NamespaceInfo
 
 class DocDef:
+  __slots__ = (
+    'type', 'title', 'description', 'deprecated', 'namespace',
+    'full_title', 'name_for_html', 'href', 'problems'
+  )
+
   def __init__(self):
     self.type = None
     self.title = None
@@ -13,56 +16,124 @@ class DocDef:
     self.deprecated = None
     self.namespace = None
 
-  def get_title(self):
+    # Filled in once by DocDef.add
+    self.full_title = None
+    self.name_for_html = None
+    self.href = None
+
+    # What was wrong with the doc block, as (rule, message) pairs
+    self.problems = None
+
+  def add_problem(self, rule, message):
+    if self.problems is None:
+      self.problems = []
+    self.problems.append((rule, message))
+
+  def make_title(self):
     if DefType.is_field(self.type) or self.type == DefType.METHOD:
       namespace = self.namespace
       return namespace + "." + self.title
     return self.title
 
+  def get_title(self):
+    if self.full_title is not None:
+      return self.full_title
+    return self.make_title()
+
   def get_name_for_html(self):
+    if self.name_for_html is not None:
+      return self.name_for_html
     return self.get_title().replace('.', '_')
 
   def get_href(self):
+    if self.href is not None:
+      return self.href
     return "Reference_" + defTypeNames[self.type][0] + "_" + self.get_name_for_html()
 
-  def add(doc_def):
-    doc_globals.href[doc_def.get_title()] = doc_def.get_href()
+  def precompute(self):
+    self.full_title = sys.intern(self.make_title())
+    self.name_for_html = self.full_title.replace('.', '_')
+    self.href = "Reference_" + defTypeNames[self.type][0] + "_" + self.name_for_html
+
+  def add(session, doc_def, order = None):
+    doc_def.precompute()
+
+    session.href[doc_def.full_title] = doc_def.href
 
-    group = doc_globals.lists[doc_def.type.value]
-    group.doc_list.append(doc_def)
+    group = session.lists[doc_def.type.value]
+    if order is None:
+      group.doc_list.append(doc_def)
+    else:
+      bisect.insort(group.doc_list, doc_def, key = order)
     group.count += 1
 
-    NamespaceInfo.add_for_doc_def(group, doc_def)
+    NamespaceInfo.add_for_doc_def(session, group, doc_def, order)
 
     if DefType.is_field(doc_def.type):
-      doc_globals.lists[DefType.FUNCTION.value].add_namespace(doc_def)
+      session.lists[DefType.FUNCTION.value].add_namespace(doc_def, order)
 
     if DefType.is_descriptive(doc_def.type):
-      doc_globals.descriptions[doc_def.title] = doc_def
+      session.descriptions[doc_def.title] = doc_def
+
+    if session.refs is not None:
+      session.refs.add(doc_def)
+
+  def remove(session, doc_def, order = None):
+    title = doc_def.get_title()
+    if session.href.get(title) == doc_def.get_href():
+      del session.href[title]
+
+    group = session.lists[doc_def.type.value]
+    group.doc_list.remove(doc_def)
+    group.count -= 1
 
-  def find_description(title):
-    if title in doc_globals.descriptions:
-      return doc_globals.descriptions[title]
+    NamespaceInfo.remove_for_doc_def(session, group, doc_def, order)
+
+    if DefType.is_field(doc_def.type):
+      session.lists[DefType.FUNCTION.value].remove_namespace(doc_def, order)
+
+    if DefType.is_descriptive(doc_def.type) and session.descriptions.get(doc_def.title) is doc_def:
+      del session.descriptions[doc_def.title]
+
+    if session.refs is not None:
+      session.refs.remove(doc_def)
+
+  def find_description(session, title):
+    if title in session.descriptions:
+      return session.descriptions[title]
 
     return None
 
 class ParamDef:
-  DEFAULT_PATTERN = r'\(default:\s*`([^`]+)`\)'
+  __slots__ = ('text', 'label', 'description', 'type', 'default_value', 'optional')
+
+  DEFAULT_PATTERN = re.compile(r'\(default:\s*`([^`]+)`\)')
+  TYPE_PATTERN = re.compile(r'\((.+?)\)')
 
   def __init__(self, text, optional):
+    type_start = text.find('(')
+    description_start = text.find(':')
+    type_end = description_start if description_start != -1 else len(text) - 1
+
     self.text = text
-    self.label = text[0:text.find('(')].strip()
-    self.description = text[text.find(':')+1:].strip()
-    self.type = re.search(r'\((.+?)\)', text[0:text.find(':')]).group(1)
+    self.label = text[0:type_start].strip()
+    self.description = text[description_start+1:].strip()
+    match = ParamDef.TYPE_PATTERN.search(text, 0, type_end)
+    if match is None:
+      raise ValueError(f"no (type) in \"{text}\"")
+
+    self.type = sys.intern(match.group(1))
     self.default_value = None
     self.optional = optional
 
-    match = re.search(self.DEFAULT_PATTERN, self.description)
+    match = ParamDef.DEFAULT_PATTERN.search(self.description)
     if match:
       self.default_value = match.group(1)
-      self.description = re.sub(self.DEFAULT_PATTERN, '', self.description)
+      self.description = ParamDef.DEFAULT_PATTERN.sub('', self.description)
 
 class FunctionDef(DocDef):
+  __slots__ = ('params', 'returns', 'return_type')
+
   def __init__(self):
     super().__init__()
 
@@ -72,6 +143,8 @@ class FunctionDef(DocDef):
     self.return_type = "void"
 
 class EnumDef(DocDef):
+  __slots__ = ('prefix',)
+
   def __init__(self):
     super().__init__()
 
@@ -79,6 +152,8 @@ class EnumDef(DocDef):
     self.prefix = None
 
 class ConstantDef(DocDef):
+  __slots__ = ('value_type',)
+
   def __init__(self):
     super().__init__()
 
@@ -86,6 +161,8 @@ class ConstantDef(DocDef):
     self.value_type = None
 
 class FieldDef(ConstantDef):
+  __slots__ = ('default_value',)
+
   def __init__(self):
     super().__init__()
 
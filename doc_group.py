@@ -1,44 +1,92 @@
+import bisect
+
 from namespace_info import NamespaceInfo
 
 class DocGroup:
-  def __init__(self):
+  def __init__(self, session, sort_namespaces = False):
+    self.session = session
     self.doc_list = []
     self.namespaces = {}
     self.namespace_list = []
     self.count = 0
     self.has_desc = 0
+    self.sort_namespaces = sort_namespaces
+
+  def insert_namespace_name(self, name, order):
+    if self.sort_namespaces:
+      bisect.insort(self.namespace_list, name)
+    else:
+      # Otherwise namespaces are listed in the order they were first seen
+      bisect.insort(self.namespace_list, name, key = lambda name: order(self.namespaces[name][0]))
+
+  def add_to_namespace(self, name, doc_def, order = None):
+    ns = self.namespaces.get(name)
+
+    # Check if this namespace exists
+    if ns is None:
+      ns = [doc_def]
+      self.namespaces[name] = ns
+      if order is None:
+        self.namespace_list.append(name)
+      else:
+        self.insert_namespace_name(name, order)
+      return
+
+    if order is None:
+      ns.append(doc_def)
+      return
+
+    first = ns[0]
+    bisect.insort(ns, doc_def, key = order)
+
+    if ns[0] is not first and not self.sort_namespaces:
+      self.namespace_list.remove(name)
+      self.insert_namespace_name(name, order)
+
+  def remove_from_namespace(self, name, doc_def, order = None):
+    ns = self.namespaces.get(name)
+    if ns is None:
+      return
 
-  def add_namespace(self, doc_def):
+    first = ns[0]
+    ns.remove(doc_def)
+
+    if len(ns) == 0:
+      del self.namespaces[name]
+      self.namespace_list.remove(name)
+    elif ns[0] is not first and not self.sort_namespaces and order is not None:
+      self.namespace_list.remove(name)
+      self.insert_namespace_name(name, order)
+
+  def add_namespace(self, doc_def, order = None):
     namespace_name = doc_def.namespace
     if namespace_name == None:
       return
 
-    ns = None
+    self.add_to_namespace(namespace_name, doc_def, order)
 
-    # Check if this namespace exists
-    if not namespace_name in self.namespaces:
-      ns = []
-      self.namespaces[namespace_name] = ns
-      self.namespace_list.append(namespace_name)
+  def remove_namespace(self, doc_def, order = None):
+    namespace_name = doc_def.namespace
+    if namespace_name == None:
+      return
 
-    ns = self.namespaces[namespace_name]
-    ns.append(doc_def)
+    self.remove_from_namespace(namespace_name, doc_def, order)
 
-  def add_prefix(self, enum_def):
+  def add_prefix(self, enum_def, order = None):
     prefix = enum_def.prefix
     if prefix == None:
       return
 
-    ns = None
+    self.add_to_namespace(prefix, enum_def, order)
 
-    # Check if this namespace exists
-    if not prefix in self.namespaces:
-      ns = []
-      self.namespaces[prefix] = ns
-      self.namespace_list.append(prefix)
+    ns_info = NamespaceInfo.get_for_enum(self.session, prefix)
+    ns_info.add_doc(enum_def, order)
+
+  def remove_prefix(self, enum_def, order = None):
+    prefix = enum_def.prefix
+    if prefix == None:
+      return
 
-    ns = self.namespaces[prefix]
-    ns.append(enum_def)
+    self.remove_from_namespace(prefix, enum_def, order)
 
-    ns_info = NamespaceInfo.get_for_enum(prefix)
-    ns_info.docs_per_def[enum_def.type.value].append(enum_def)
+    NamespaceInfo.remove_doc(self.session, prefix, enum_def)
@@ -0,0 +1,260 @@
+import os, io, asyncio, hashlib, threading, collections
+
+from sys import stderr
+from urllib.parse import urlsplit, unquote
+
+from enums import DefType, defTypeNames
+from html_writer import HTMLWriter
+from search_index import SearchIndex
+from writer import Writer
+
+class PageCache:
+  def __init__(self, size):
+    self.size = size
+    self.pages = collections.OrderedDict()
+
+  def get(self, name):
+    page = self.pages.get(name)
+    if page is not None:
+      self.pages.move_to_end(name)
+    return page
+
+  def put(self, name, page):
+    self.pages[name] = page
+    self.pages.move_to_end(name)
+
+    # Drop the least recently used pages
+    while len(self.pages) > self.size:
+      self.pages.popitem(last = False)
+
+  def discard(self, name):
+    self.pages.pop(name, None)
+
+  def clear(self):
+    self.pages.clear()
+
+# Serves the split HTML reference from memory, rendering each page the first time it's asked for
+class DocServer:
+  HOST = "127.0.0.1"
+  CACHE_SIZE = 256
+
+  CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8"
+  }
+
+  STATUS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed"
+  }
+
+  def __init__(self, session, html_writer, port, watch = None):
+    self.session = session
+    self.writer = html_writer
+    self.port = port
+    self.watch = watch
+    self.cache = PageCache(DocServer.CACHE_SIZE)
+    self.routes = {}
+    self.links = None
+
+    self.update_routes()
+
+  def get_list_page_name(type):
+    return defTypeNames[type][0].replace(' ', '_') + ".html"
+
+  def write_search_script(file):
+    file.write(SearchIndex.read_script(os.path.join(os.path.dirname(os.path.abspath(__file__)), SearchIndex.SCRIPT)))
+
+  def write_search_index(self, file):
+    SearchIndex.build(self.session, self.writer.get_docs, self.writer.describe).write_file(file)
+
+  def update_routes(self):
+    # Links point to where the pages of a split reference would be
+    self.writer.assign_pages()
+
+    routes = {
+      HTMLWriter.INDEX_PAGE: (self.writer.write_index_page,),
+      HTMLWriter.STYLESHEET: (self.writer.write_stylesheet,)
+    }
+
+    if self.writer.use_search:
+      routes[SearchIndex.FILENAME] = (self.write_search_index,)
+      routes[SearchIndex.SCRIPT] = (DocServer.write_search_script,)
+
+    for type in DefType:
+      if not DefType.is_descriptive(type) and Writer.can_write_docs(self.session, type):
+        routes[DocServer.get_list_page_name(type)] = (self.writer.write_list_page, type)
+
+    for name in self.session.namespaces:
+      routes[HTMLWriter.get_page_name(name)] = (self.writer.write_namespace_page, name)
+
+    self.routes = routes
+
+    old_links = self.links
+    self.links = self.writer.get_links()
+
+    return old_links
+
+  def invalidate(self, namespaces, types):
+    namespaces = set(namespaces)
+    types = set(types)
+
+    # Pages that link to a definition that moved are dropped as well
+    old_links = self.update_routes()
+    self.writer.add_referring_pages(old_links, self.links, namespaces, types)
+
+    for name in namespaces:
+      self.cache.discard(HTMLWriter.get_page_name(name))
+
+    for type in types:
+      self.cache.discard(DocServer.get_list_page_name(type))
+
+    self.cache.discard(HTMLWriter.INDEX_PAGE)
+    self.cache.discard(SearchIndex.FILENAME)
+
+  def get_page(self, name):
+    page = self.cache.get(name)
+    if page is not None:
+      return page
+
+    route = self.routes.get(name)
+    if route is None:
+      return None
+
+    file = io.StringIO()
+    route[0](file, *route[1:])
+
+    body = file.getvalue().encode('utf-8')
+    page = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+    self.cache.put(name, page)
+
+    return page
+
+  def get_content_type(name):
+    return DocServer.CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+
+  def is_not_modified(etag, if_none_match):
+    if if_none_match is None:
+      return False
+
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or ("W/" + etag) in tags
+
+  def send(writer, status, body = b"", headers = None, keep_alive = True, send_body = True):
+    lines = [f"HTTP/1.1 {status} {DocServer.STATUS[status]}"]
+
+    for name, value in (headers or {}).items():
+      lines.append(f"{name}: {value}")
+
+    if status != 304:
+      lines.append(f"Content-Length: {len(body)}")
+    if not keep_alive:
+      lines.append("Connection: close")
+
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+    if send_body and status != 304:
+      writer.write(body)
+
+  def handle_request(self, request, writer):
+    lines = request.decode('latin-1').split("\r\n")
+
+    parts = lines[0].split()
+    if len(parts) != 3:
+      DocServer.send(writer, 400, b"Bad request\n", keep_alive = False)
+      return False
+
+    method, target, version = parts
+
+    headers = {}
+    for line in lines[1:]:
+      name, separator, value = line.partition(':')
+      if separator:
+        headers[name.strip().lower()] = value.strip()
+
+    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+    # Requests with a body aren't expected, so the connection isn't reused after one
+    if method != "GET" and method != "HEAD":
+      DocServer.send(writer, 405, b"Method not allowed\n", { "Allow": "GET, HEAD" }, False)
+      return False
+
+    name = unquote(urlsplit(target).path).lstrip('/') or HTMLWriter.INDEX_PAGE
+
+    page = self.get_page(name)
+    if page is None:
+      DocServer.send(writer, 404, b"Not found\n", { "Content-Type": "text/plain" }, keep_alive, method == "GET")
+      return keep_alive
+
+    body, etag = page
+    status = 200
+    if DocServer.is_not_modified(etag, headers.get("if-none-match")):
+      status = 304
+
+    response_headers = {
+      "Content-Type": DocServer.get_content_type(name),
+      "ETag": etag,
+      "Cache-Control": "no-cache"
+    }
+    DocServer.send(writer, status, body, response_headers, keep_alive, method == "GET")
+
+    return keep_alive
+
+  async def handle(self, reader, writer):
+    try:
+      while True:
+        try:
+          request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+          break
+
+        keep_alive = self.handle_request(request, writer)
+        await writer.drain()
+
+        if not keep_alive:
+          break
+    except ConnectionError:
+      pass
+    finally:
+      writer.close()
+
+  def wait_for_changes(self, loop, queue):
+    # Waiting blocks, so it happens on a thread that doesn't hold up exiting
+    while True:
+      paths = self.watch.watcher.wait()
+      loop.call_soon_threadsafe(queue.put_nowait, paths)
+
+  async def watch_changes(self):
+    queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    threading.Thread(target = self.wait_for_changes, args = (loop, queue), daemon = True).start()
+
+    while True:
+      paths = await queue.get()
+
+      start = loop.time()
+      namespaces, types = self.watch.update(paths)
+      self.invalidate(namespaces, types)
+      elapsed = (loop.time() - start) * 1000
+
+      stderr.write(f"docgen: updated {len(paths)} file(s) in {elapsed:.0f} ms\n")
+
+  async def serve(self):
+    server = await asyncio.start_server(self.handle, DocServer.HOST, self.port)
+
+    stderr.write(f"docgen: serving on http://{DocServer.HOST}:{self.port}/ (Ctrl+C to stop)\n")
+
+    async with server:
+      if self.watch is None:
+        await server.serve_forever()
+      else:
+        await asyncio.gather(server.serve_forever(), self.watch_changes())
+
+  def run(self):
+    try:
+      asyncio.run(self.serve())
+    except KeyboardInterrupt:
+      pass
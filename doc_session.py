@@ -0,0 +1,30 @@
+from enums import DefType
+from doc_group import DocGroup
+
+class DocSession:
+  def __init__(self):
+    self.href = {}
+    self.descriptions = {}
+    self.lists = []
+    self.namespaces = {}
+
+    # Which page each anchor is on, when the reference is split into several pages
+    self.pages = {}
+
+    # Short ids to use in place of anchors, when the HTML writer is asked for them
+    self.anchors = {}
+
+    # The reference graph, once it's been built
+    self.refs = None
+
+    for type in DefType:
+      self.lists.append(DocGroup(self, DefType.has_sorted_namespaces(type)))
+
+  def get_anchor(self, anchor):
+    return self.anchors.get(anchor, anchor)
+
+  def get_link(self, anchor):
+    page = self.pages.get(anchor)
+    if page is None:
+      return "#" + self.get_anchor(anchor)
+    return page + "#" + self.get_anchor(anchor)
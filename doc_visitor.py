@@ -0,0 +1,23 @@
+from enums import DefType, defTypeNames
+from profiler import Profiler
+
+# Walks the model once and hands every definition to each output sink.
+# A sink has begin(visitor), visit(doc, type) and finish().
+class DocVisitor:
+  def __init__(self, session, sinks):
+    self.session = session
+    self.sinks = sinks
+
+  def run(self):
+    for sink in self.sinks:
+      sink.begin(self)
+
+    for type in DefType:
+      with Profiler.section(f"visit: {defTypeNames[type][1]}", "write"):
+        for doc in self.session.lists[type.value].doc_list:
+          for sink in self.sinks:
+            sink.visit(doc, type)
+
+    for sink in self.sinks:
+      with Profiler.section(f"finish: {sink.__class__.__name__}", "write"):
+        sink.finish()
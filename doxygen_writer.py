@@ -1,12 +1,16 @@
-import doc_globals
+import concurrent.futures
 
 from enums import DefType
 from doc_def import DocDef
-from namespace_info import NamespaceInfo
 from parser import Parser
 from writer import Writer
+from profiler import Profiler
+from manifest import OutputManifest
 
 class DoxygenWriter:
+  # Files with at least this many definitions are rendered in another process
+  HEAVY_TASK_SIZE = 200
+
   def generate_text_for_file(text, filename = None):
     result = "// Generated by docgen\n"
     if filename:
@@ -56,7 +60,7 @@ class DoxygenWriter:
 
     params = []
     for param in doc.params:
-      param_type = Parser.parse_ref(param.type)
+      param_type = Writer.process_type(param.type)
       param_text = f"{param_type} {param.label}"
       if param.default_value:
         param_text += f"={param.default_value}"
@@ -120,7 +124,26 @@ class DoxygenWriter:
 
     return text
 
-  def write_class(docs, name, desc_doc):
+  def write_member(doc):
+    if doc.type == DefType.FUNCTION:
+      return DoxygenWriter.write_class_function(doc, f"public {doc.return_type}")
+    elif doc.type == DefType.METHOD:
+      return DoxygenWriter.write_function(doc.title, doc, f"public {doc.return_type}")
+    elif doc.type == DefType.CONSTRUCTOR:
+      # Named after the class, which is the last part of the namespace
+      return DoxygenWriter.write_function(doc.namespace.rsplit('.', 1)[-1], doc, "public")
+    elif doc.type == DefType.FIELD:
+      return DoxygenWriter.write_field(doc, f"public {doc.value_type}")
+    return ""
+
+  def get_members(docs, members, render_fn):
+    # Members may already have been rendered while visiting every definition
+    if members is not None:
+      return members
+
+    return [render_fn(doc) for doc in docs]
+
+  def write_class(docs, name, desc_doc, members = None):
     if desc_doc:
       description = DoxygenWriter.process_description(desc_doc.description)
     else:
@@ -138,15 +161,8 @@ class DoxygenWriter:
     text += f"class {name}"
     text += " {\n"
 
-    for doc in docs:
-      if doc.type == DefType.FUNCTION:
-        text += DoxygenWriter.write_class_function(doc, f"public {doc.return_type}")
-      elif doc.type == DefType.METHOD:
-        text += DoxygenWriter.write_function(doc.title, doc, f"public {doc.return_type}")
-      elif doc.type == DefType.CONSTRUCTOR:
-        text += DoxygenWriter.write_function(name, doc, "public")
-      elif doc.type == DefType.FIELD:
-        text += DoxygenWriter.write_field(doc, f"public {doc.value_type}")
+    for member in DoxygenWriter.get_members(docs, members, DoxygenWriter.write_member):
+      text += member
       text += "\n"
 
     text += "};"
@@ -175,7 +191,19 @@ class DoxygenWriter:
 
     return text
 
-  def write_enum(docs, name):
+  def write_enum_value(doc):
+    title = doc.get_title()
+    description = DoxygenWriter.process_description(doc.description)
+
+    text = "    /*!\n"
+    text += f"        {description}\n"
+    text += "    */\n"
+    text += f"    {title},"
+    text += "\n"
+
+    return text
+
+  def write_enum(docs, name, members = None):
     text = ""
 
     # TODO: Allow actually writing a description for this
@@ -194,15 +222,8 @@ class DoxygenWriter:
     text += f"enum {name}"
     text += " {\n"
 
-    for doc in docs:
-      title = doc.get_title()
-      description = DoxygenWriter.process_description(doc.description)
-
-      text += "    /*!\n"
-      text += f"        {description}\n"
-      text += "    */\n"
-      text += f"    {title},"
-      text += "\n"
+    for member in DoxygenWriter.get_members(docs, members, DoxygenWriter.write_enum_value):
+      text += member
 
     text += "};"
 
@@ -239,22 +260,78 @@ class DoxygenWriter:
 
     return text
 
-  def generate_files(path):
+  def render_file(text, filename = None):
+    return DoxygenWriter.generate_text_for_file(text, filename)
+
+  def render_doc(doc):
+    # The text for one definition, wherever it ends up in the output
+    if doc.type == DefType.ENUM:
+      return DoxygenWriter.write_enum_value(doc)
+    elif doc.type == DefType.CONSTANT:
+      return DoxygenWriter.write_constant(doc)
+    elif doc.type == DefType.GLOBAL_VAR:
+      return DoxygenWriter.write_global(doc)
+    elif doc.namespace is not None:
+      return DoxygenWriter.write_member(doc)
+    return None
+
+  def render_class_file(docs, name, desc_doc, members = None):
+    return DoxygenWriter.render_file(DoxygenWriter.write_class(docs, name, desc_doc, members))
+
+  def render_enum_file(docs, name, filename, members = None):
+    return DoxygenWriter.render_file(DoxygenWriter.write_enum(docs, name, members), filename)
+
+  def render_namespace_file(classes, name, desc_doc):
+    class_text = ""
+
+    for klass, doc_list, class_desc, members in classes:
+      class_text += DoxygenWriter.write_class(doc_list, klass, class_desc, members)
+      class_text += "\n"
+
+    return DoxygenWriter.render_file(DoxygenWriter.write_namespace(class_text, name, desc_doc))
+
+  def render_constants_file(docs, filename, members = None):
+    text = "// This is not valid HSL code!\n"
+    for member in DoxygenWriter.get_members(docs, members, DoxygenWriter.write_constant):
+      text += member
+    return DoxygenWriter.render_file(text, filename)
+
+  def render_globals_file(docs, filename, members = None):
+    text = ""
+    for member in DoxygenWriter.get_members(docs, members, DoxygenWriter.write_global):
+      text += member
+    return DoxygenWriter.render_file(text, filename)
+
+  def get_rendered(docs, rendered):
+    if rendered is None:
+      return None
+
+    return [rendered[id(doc)] for doc in docs]
+
+  def get_class_info(info):
+    # A new list, so the namespace's own lists are never modified
+    return (
+      info.docs_per_def[DefType.FUNCTION.value] +
+      info.docs_per_def[DefType.METHOD.value] +
+      info.docs_per_def[DefType.CONSTRUCTOR.value] +
+      info.docs_per_def[DefType.FIELD.value]
+    )
+
+  def get_file_tasks(session, rendered = None):
+    # Each task is (filename, render function, arguments, number of definitions)
+    tasks = []
+
     # Write base.hsl
-    with open(path / 'base.hsl', 'w') as file:
-      text = "/** \\defgroup hsl HSL\n"
-      text += " * \\brief Documents HSL classes, enums and constants."
-      text += " */\n"
-      file.write(text)
+    text = "/** \\defgroup hsl HSL\n"
+    text += " * \\brief Documents HSL classes, enums and constants."
+    text += " */\n"
+    tasks.append(('base.hsl', str, (text,), 0))
 
     # Write namespaces (as in what happens when you use \ns)
     namespace_docs = {}
 
-    for name, info in NamespaceInfo.all.items():
-      class_info = info.docs_per_def[DefType.FUNCTION.value]
-      class_info += info.docs_per_def[DefType.METHOD.value]
-      class_info += info.docs_per_def[DefType.CONSTRUCTOR.value]
-      class_info += info.docs_per_def[DefType.FIELD.value]
+    for name, info in session.namespaces.items():
+      class_info = DoxygenWriter.get_class_info(info)
 
       if '.' in name:
         if len(class_info) > 0:
@@ -264,65 +341,112 @@ class DoxygenWriter:
           namespace_docs[ns_parts[0]][ns_parts[1]] = class_info
         continue
 
-      desc_doc = DocDef.find_description(name)
+      desc_doc = DocDef.find_description(session, name)
 
       # Write functions, methods, constructors, and fields
       if len(class_info) > 0:
-        filename = path / f"{name}.dox"
-        with open(filename, 'w') as file:
-          text = DoxygenWriter.write_class(class_info, name, desc_doc)
-          text = DoxygenWriter.generate_text_for_file(text)
-          file.write(text)
+        args = (class_info, name, desc_doc, DoxygenWriter.get_rendered(class_info, rendered))
+        tasks.append((f"{name}.dox", DoxygenWriter.render_class_file, args, len(class_info)))
 
       # Write enums
       enums = info.docs_per_def[DefType.ENUM.value]
       if len(enums) > 0:
         name = name.replace('_*', '')
         enum_filename = f"{name}.hsl"
-        filename = path / enum_filename
-        with open(filename, 'w') as file:
-          text = DoxygenWriter.write_enum(enums, name)
-          text = DoxygenWriter.generate_text_for_file(text, enum_filename)
-          file.write(text)
+        args = (enums, name, enum_filename, DoxygenWriter.get_rendered(enums, rendered))
+        tasks.append((enum_filename, DoxygenWriter.render_enum_file, args, len(enums)))
 
     # Write namespaces
     for name in namespace_docs:
-      filename = path / f"{name}.dox"
-      with open(filename, 'w') as file:
-        ns_class = namespace_docs[name]
-
-        class_text = ""
+      classes = []
+      count = 0
 
-        for klass in ns_class:
-          class_name = f"{name}.{klass}"
-          class_desc = DocDef.find_description(class_name)
+      for klass, doc_list in namespace_docs[name].items():
+        class_desc = DocDef.find_description(session, f"{name}.{klass}")
+        classes.append((klass, doc_list, class_desc, DoxygenWriter.get_rendered(doc_list, rendered)))
+        count += len(doc_list)
 
-          doc_list = namespace_docs[name][klass]
-
-          class_text += DoxygenWriter.write_class(doc_list, klass, class_desc)
-          class_text += "\n"
-
-        desc_doc = DocDef.find_description(name)
-        text = DoxygenWriter.write_namespace(class_text, name, desc_doc)
-        text = DoxygenWriter.generate_text_for_file(text)
-        file.write(text)
+      desc_doc = DocDef.find_description(session, name)
+      args = (classes, name, desc_doc)
+      tasks.append((f"{name}.dox", DoxygenWriter.render_namespace_file, args, count))
 
     # Write constants
-    constants_group = doc_globals.lists[DefType.CONSTANT.value]
     filename = "constants.hsl"
-    with open(path / filename, 'w') as file:
-      text = "// This is not valid HSL code!\n"
-      for doc in constants_group.doc_list:
-        text += DoxygenWriter.write_constant(doc)
-      text = DoxygenWriter.generate_text_for_file(text, filename)
-      file.write(text)
+    docs = session.lists[DefType.CONSTANT.value].doc_list
+    args = (docs, filename, DoxygenWriter.get_rendered(docs, rendered))
+    tasks.append((filename, DoxygenWriter.render_constants_file, args, len(docs)))
 
-    # Write constants
-    globals_group = doc_globals.lists[DefType.GLOBAL_VAR.value]
+    # Write globals
     filename = "globals.hsl"
-    with open(path / filename, 'w') as file:
-      text = ""
-      for doc in globals_group.doc_list:
-        text += DoxygenWriter.write_global(doc)
-      text = DoxygenWriter.generate_text_for_file(text, filename)
-      file.write(text)
+    docs = session.lists[DefType.GLOBAL_VAR.value].doc_list
+    args = (docs, filename, DoxygenWriter.get_rendered(docs, rendered))
+    tasks.append((filename, DoxygenWriter.render_globals_file, args, len(docs)))
+
+    return tasks
+
+  def render_tasks(tasks, jobs):
+    results = [None] * len(tasks)
+
+    heavy = []
+    if jobs > 1:
+      heavy = [index for index, task in enumerate(tasks) if task[3] >= DoxygenWriter.HEAVY_TASK_SIZE]
+
+    if len(heavy) == 0:
+      for index, (_, render_fn, args, _) in enumerate(tasks):
+        results[index] = render_fn(*args)
+      return results
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers = jobs) as executor:
+      futures = {}
+
+      # Big namespaces go first, so the pool isn't left waiting on one at the end
+      heavy.sort(key = lambda index: tasks[index][3], reverse = True)
+      for index in heavy:
+        _, render_fn, args, _ = tasks[index]
+        futures[index] = executor.submit(render_fn, *args)
+
+      # Small files are rendered here while the pool works
+      for index, (_, render_fn, args, _) in enumerate(tasks):
+        if not index in futures:
+          results[index] = render_fn(*args)
+
+      for index, future in futures.items():
+        results[index] = future.result()
+
+    return results
+
+  def generate_files(session, path, jobs = 1, rendered = None):
+    # With every definition already rendered, what's left is too cheap to send to other processes
+    render_jobs = jobs if rendered is None else 1
+
+    with Profiler.section("render", "write"):
+      tasks = DoxygenWriter.get_file_tasks(session, rendered)
+      results = DoxygenWriter.render_tasks(tasks, render_jobs)
+
+    # Later files replace earlier ones with the same name, like a serial run
+    files = {}
+    for (filename, _, _, _), text in zip(tasks, results):
+      files[filename] = text
+
+    # Only files whose contents changed are written
+    with Profiler.section("write files", "write"):
+      manifest = OutputManifest(path)
+      manifest.write_files(files, jobs)
+      manifest.finish()
+      manifest.report()
+
+class DoxygenSink:
+  def __init__(self, session, path, jobs = 1):
+    self.session = session
+    self.path = path
+    self.jobs = jobs
+    self.rendered = {}
+
+  def begin(self, visitor):
+    pass
+
+  def visit(self, doc, type):
+    self.rendered[id(doc)] = DoxygenWriter.render_doc(doc)
+
+  def finish(self):
+    DoxygenWriter.generate_files(self.session, self.path, self.jobs, self.rendered)
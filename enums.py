@@ -21,6 +21,9 @@ class DefType(Enum):
   def is_method(type):
     return type == DefType.METHOD or type == DefType.CONSTRUCTOR
 
+  def has_sorted_namespaces(type):
+    return type == DefType.FUNCTION or type == DefType.METHOD or type == DefType.ENUM
+
 defTypeNames = {
   DefType.FUNCTION: ("functions", "Class methods"),
   DefType.METHOD: ("methods", "Instance methods"),
@@ -1,109 +1,159 @@
-import doc_globals
+import os, re, base64, hashlib, functools
 
 from enums import DefType, defTypeNames
+from doc_def import DocDef
 from namespace_info import NamespaceInfo
-from parser import Parser
 from writer import Writer
+from search_index import SearchIndex
+from profiler import Profiler
+from ref_graph import RefGraph
 
 class HTMLWriter:
-  def write_namespace_link_list(type):
-    group = doc_globals.lists[type.value]
-
-    text = f"        <h3>{NamespaceInfo.get_title(type)}</h3>\n"
-    text += "        <ul>\n"
+  INDEX_PAGE = "index.html"
+  CONSTANTS_PAGE = "constants.html"
+  GLOBALS_PAGE = "globals.html"
+  STYLESHEET = "style.css"
+  SHORT_ANCHOR_LENGTH = 6
+
+  # Inline styles, and the classes that stand in for them in compact mode
+  STYLES = {
+    "title": "margin-bottom: 8px;",
+    "nodesc": "margin-bottom: 8px; color: red;",
+    "desc": "margin-top: 8px; font-size: 14px;",
+    "info": "font-size: 14px;",
+    "label": "font-weight: bold; margin-top: 8px;",
+    "params": "margin-top: 0px; font-size: 14px;",
+    "corner": "position: fixed; margin-top: -32px; margin-left: -96px; width: 100%; text-align: right;",
+    "search": "margin-bottom: 16px;",
+    "search-input": "width: 320px;",
+    "search-results": "font-size: 14px;"
+  }
+
+  def __init__(self, session, use_search = False, use_referenced_by = False, compact = False, short_anchors = False):
+    self.session = session
+    self.use_search = use_search
+    self.use_referenced_by = use_referenced_by
+    self.compact = compact
+    self.short_anchors = short_anchors
+
+    # The attribute each element is styled with
+    self.styles = {}
+    for name, style in HTMLWriter.STYLES.items():
+      if compact:
+        self.styles[name] = f"class=\"{name}\""
+      else:
+        self.styles[name] = f"style=\"{style}\""
+
+    # Where each title linked to when the pages were last written
+    self.written_links = None
+
+    # Renders descriptions, through Markup's bounded cache
+    self.describe = functools.partial(Writer.process_description, session = session)
+
+    # Makes compressed copies of each file as it's written, if set
+    self.compressor = None
+
+  def write_namespace_link_list(self, file, type):
+    group = self.session.lists[type.value]
+
+    file.write(f"        <h3>{NamespaceInfo.get_title(type)}</h3>\n")
+    file.write("        <ul>\n")
 
     if type == DefType.FUNCTION or type == DefType.METHOD or type == DefType.ENUM:
       for namespace_name in group.namespace_list:
-        if type == DefType.ENUM and not NamespaceInfo.all[namespace_name].is_enum_namespace:
+        if type == DefType.ENUM and not self.session.namespaces[namespace_name].is_enum_namespace:
           continue
 
         href = NamespaceInfo.get_href(namespace_name)
-        text += f"            <li><a href=\"#{href}\">{namespace_name}</a></li>\n"
+        file.write(f"            <li><a href=\"{self.session.get_link(href)}\">{namespace_name}</a></li>\n")
     else:
       for doc in group.doc_list:
         href = doc.get_href()
         title = doc.get_title()
-        text += f"                    <li><a href=\"#{href}\">{title}</a></li>\n"
+        file.write(f"                    <li><a href=\"{self.session.get_link(href)}\">{title}</a></li>\n")
 
-    return text + "        </ul>\n"
+    file.write("        </ul>\n")
 
-  def write_enum_namespace_contents_list():
+  def write_enum_namespace_contents_list(self, file):
     def_type = DefType.ENUM
 
-    text = f"        <h3>{NamespaceInfo.get_title(def_type)}</h3>\n"
+    file.write(f"        <h3>{NamespaceInfo.get_title(def_type)}</h3>\n")
 
-    group = doc_globals.lists[def_type.value]
+    group = self.session.lists[def_type.value]
 
     for namespace_name in group.namespace_list:
-      namespace_info = NamespaceInfo.all[namespace_name]
+      namespace_info = self.session.namespaces[namespace_name]
       if not namespace_info.is_enum_namespace:
         continue
 
-      text += f"            <p id=\"{NamespaceInfo.get_href(namespace_name)}\">\n"
-      text += f"                <h2><code>{namespace_name}</code></h2>\n"
+      file.write(f"            <p id=\"{self.session.get_anchor(NamespaceInfo.get_href(namespace_name))}\">\n")
+      file.write(f"                <h2><code>{namespace_name}</code></h2>\n")
 
       if len(namespace_info.docs_per_def[def_type.value]) == 0:
         break
 
-      text += "                <ul>\n"
+      file.write("                <ul>\n")
 
       for doc in namespace_info.docs_per_def[def_type.value]:
-        text += f"                    <li><a href=\"#{doc.get_href()}\">{doc.get_title()}</a></li>\n"
-
-      text += "                </ul>\n"
-      text += "            </p>\n"
+        file.write(f"                    <li><a href=\"{self.session.get_link(doc.get_href())}\">{doc.get_title()}</a></li>\n")
 
-    return text
+      file.write("                </ul>\n")
+      file.write("            </p>\n")
 
-  def write_namespace_contents_list(type):
+  def write_namespace_contents_list(self, file, type):
     if type == DefType.ENUM:
-      return HTMLWriter.write_enum_namespace_contents_list()
+      self.write_enum_namespace_contents_list(file)
+      return
 
-    text = f"        <h3>{defTypeNames[type][1]}</h3>\n"
+    file.write(f"        <h3>{defTypeNames[type][1]}</h3>\n")
 
-    group = doc_globals.lists[type.value]
+    group = self.session.lists[type.value]
 
     for namespace_name in group.namespace_list:
-      text += f"            <p id=\"{NamespaceInfo.get_href(namespace_name)}\">\n"
-      text += "                <h2>" + namespace_name + "</h2>\n"
+      file.write(f"            <p id=\"{self.session.get_anchor(NamespaceInfo.get_href(namespace_name))}\">\n")
+      file.write("                <h2>" + namespace_name + "</h2>\n")
 
-      namespace_info = NamespaceInfo.all[namespace_name]
+      namespace_info = self.session.namespaces[namespace_name]
 
-      for def_type in DefType:
-        if len(namespace_info.docs_per_def[def_type.value]) == 0:
-          continue
+      self.write_namespace_contents(file, namespace_info)
+
+      file.write("            </p>\n")
 
-        text += f"                <i>{defTypeNames[def_type][1]}:</i>\n"
-        text += "                <ul>\n"
+  def write_namespace_contents(self, file, namespace_info):
+    for def_type in DefType:
+      if len(namespace_info.docs_per_def[def_type.value]) == 0:
+        continue
 
-        for doc in namespace_info.docs_per_def[def_type.value]:
-          text += f"                    <li><a href=\"#{doc.get_href()}\">{doc.get_title()}</a></li>\n"
+      file.write(f"                <i>{defTypeNames[def_type][1]}:</i>\n")
+      file.write("                <ul>\n")
 
-        text += "                </ul>\n"
+      for doc in namespace_info.docs_per_def[def_type.value]:
+        file.write(f"                    <li><a href=\"{self.session.get_link(doc.get_href())}\">{doc.get_title()}</a></li>\n")
 
-      text += "            </p>\n"
+      file.write("                </ul>\n")
 
-    return text
+  def write_docdef_title(self, doc):
+    return f"        <h3 {self.styles['title']}><code>{doc.get_title()}</code></h2>\n"
 
-  def write_docdef_title(doc):
-    return f"        <h3 style=\"margin-bottom: 8px;\"><code>{doc.get_title()}</code></h2>\n"
+  def process_description(self, description):
+    return self.describe(description)
 
-  def write_docdef_description(doc):
-    description = Writer.process_description(doc.description) or ""
-    return f"        <div style=\"margin-top: 8px; font-size: 14px;\">{description}</div>\n"
+  def write_docdef_description(self, doc):
+    description = self.process_description(doc.description) or ""
+    return f"        <div {self.styles['desc']}>{description}</div>\n"
 
-  def write_docdef_type(doc):
-    return f"        <div style=\"font-size: 14px;\"><b>Type: </b>{doc.value_type}</div>\n"
+  def write_docdef_type(self, doc):
+    return f"        <div {self.styles['info']}><b>Type: </b>{doc.value_type}</div>\n"
 
-  def write_generic_docs(doc):
-    text = HTMLWriter.write_docdef_title(doc)
+  def write_generic_docs(self, doc):
+    text = self.write_docdef_title(doc)
 
     if doc.description is not None:
-      text += HTMLWriter.write_docdef_description(doc)
+      text += self.write_docdef_description(doc)
 
     return text
 
-  def write_function_docs(doc):
+  def write_function_docs(self, doc):
     title = doc.get_title()
     parameters = Writer.write_function_parameters(doc)
     description = doc.description
@@ -112,102 +162,124 @@ class HTMLWriter:
     text = None
 
     if description is not None:
-      text = f"        <h2 style=\"margin-bottom: 8px;\">{title}</h2>\n"
+      text = f"        <h2 {self.styles['title']}>{title}</h2>\n"
     else:
-      text = f"        <h2 style=\"margin-bottom: 8px; color: red;\">{title}</h2>\n"
+      text = f"        <h2 {self.styles['nodesc']}>{title}</h2>\n"
 
     text += f"        <code>{title}{parameters}</code>\n"
 
     if description is not None:
-      text += HTMLWriter.write_docdef_description(doc)
+      text += self.write_docdef_description(doc)
 
     if len(doc.params) > 0:
-      text += "        <div style=\"font-weight: bold; margin-top: 8px;\">Parameters:</div>\n"
-      text += "        <ul style=\"margin-top: 0px; font-size: 14px;\">\n"
+      text += f"        <div {self.styles['label']}>Parameters:</div>\n"
+      text += f"        <ul {self.styles['params']}>\n"
 
       for param in doc.params:
-        type = Parser.parse_ref(param.type, False, True)
-        description = Writer.process_description(param.description) or ""
+        type = Writer.process_type(param.type, True, self.session)
+        description = self.process_description(param.description) or ""
         if description:
           description = f": {description}"
         text += f"        <li><b>{param.label} ({type})</b>{description}</li>\n"
 
       text += "        </ul>\n"
 
-    returns_description = Writer.process_description(returns)
+    returns_description = self.process_description(returns)
     if returns_description:
-      text += "        <div style=\"font-weight: bold; margin-top: 8px;\">Returns:</div>\n"
-      text += f"        <div style=\"font-size: 14px;\">{returns_description}</div>\n"
+      text += f"        <div {self.styles['label']}>Returns:</div>\n"
+      text += f"        <div {self.styles['info']}>{returns_description}</div>\n"
 
     return text
 
-  def write_constant_docs(doc):
-    text = HTMLWriter.write_docdef_title(doc)
+  def write_constant_docs(self, doc):
+    text = self.write_docdef_title(doc)
 
     if doc.value_type is not None:
-      text += HTMLWriter.write_docdef_type(doc)
+      text += self.write_docdef_type(doc)
 
     if doc.description is not None:
-      text += HTMLWriter.write_docdef_description(doc)
+      text += self.write_docdef_description(doc)
 
     return text
 
-  def write_field_docs(doc):
-    text = HTMLWriter.write_docdef_title(doc)
+  def write_field_docs(self, doc):
+    text = self.write_docdef_title(doc)
 
     if doc.value_type is not None:
-      text += HTMLWriter.write_docdef_type(doc)
+      text += self.write_docdef_type(doc)
 
     default_value = doc.default_value
     if default_value is not None:
-      text += f"        <div style=\"font-size: 14px;\"><b>Default: </b><code>{default_value}</code></div>\n"
+      text += f"        <div {self.styles['info']}><b>Default: </b><code>{default_value}</code></div>\n"
 
     if doc.description is not None:
-      text += HTMLWriter.write_docdef_description(doc)
+      text += self.write_docdef_description(doc)
 
     return text
 
-  def write_docdef(group, doc, type):
-    text = f"        <p id=\"{doc.get_href()}\">\n"
+  def write_referenced_by(self, doc):
+    docs = self.session.refs.get_referenced_by(doc)
+    if len(docs) == 0:
+      return ""
+
+    links = ", ".join(f"<a href=\"{self.session.get_link(ref.get_href())}\">{ref.get_title()}</a>" for ref in docs)
+    return f"        <div {self.styles['desc']}><b>Referenced by: </b>{links}</div>\n"
+
+  def render_docdef(self, doc, type):
+    text = f"        <p id=\"{self.session.get_anchor(doc.get_href())}\">\n"
 
     if type == DefType.FUNCTION or type == DefType.METHOD or type == DefType.CONSTRUCTOR:
-      text += HTMLWriter.write_function_docs(doc)
+      text += self.write_function_docs(doc)
     elif type == DefType.CONSTANT:
-      text += HTMLWriter.write_constant_docs(doc)
+      text += self.write_constant_docs(doc)
     elif type == DefType.FIELD or type == DefType.CLASS_FIELD:
-      text += HTMLWriter.write_field_docs(doc)
+      text += self.write_field_docs(doc)
     else:
-      text += HTMLWriter.write_generic_docs(doc)
+      text += self.write_generic_docs(doc)
 
-    if doc.description is not None:
-      group.has_desc += 1
+    if self.use_referenced_by:
+      text += self.write_referenced_by(doc)
 
     text += "        </p>\n"
 
     return text
 
-  def write_docs(type):
-    text = f"        <h3>{defTypeNames[type][1]}</h3>\n"
+  def write_docdef(self, file, group, doc, type):
+    text = self.render_docdef(doc, type)
+
+    if doc.description is not None:
+      group.has_desc += 1
+
+    file.write(text)
 
-    group = doc_globals.lists[type.value]
+  def get_docs(self, type):
+    group = self.session.lists[type.value]
 
     if type == DefType.CONSTANT or type == DefType.GLOBAL_VAR:
-      for doc in group.doc_list:
-        text += HTMLWriter.write_docdef(group, doc, type)
+      yield from group.doc_list
     else:
       for namespace_name in group.namespace_list:
-        namespace_info = NamespaceInfo.all[namespace_name]
+        namespace_info = self.session.namespaces[namespace_name]
+        yield from namespace_info.docs_per_def[type.value]
+
+  def write_docs(self, file, type):
+    file.write(f"        <h3>{defTypeNames[type][1]}</h3>\n")
+
+    group = self.session.lists[type.value]
+    group.has_desc = 0
 
-        for doc in namespace_info.docs_per_def[type.value]:
-          text += HTMLWriter.write_docdef(group, doc, type)
+    for doc in self.get_docs(type):
+      self.write_docdef(file, group, doc, type)
 
     with_descriptions = str(group.has_desc)
     without_descriptions = str(group.count)
 
-    text += f"        <p>{with_descriptions} out of {without_descriptions} {defTypeNames[type][0]} have descriptions. </p>\n"
-    text += "        <hr/>\n"
+    file.write(f"        <p>{with_descriptions} out of {without_descriptions} {defTypeNames[type][0]} have descriptions. </p>\n")
+    file.write("        <hr/>\n")
 
-    return text
+  def get_stylesheet_path():
+    # Next to this file, like the search script, so it's found from any directory
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), HTMLWriter.STYLESHEET)
 
   def read_stylesheet(path):
     try:
@@ -216,28 +288,117 @@ class HTMLWriter:
     except FileNotFoundError:
       return ""
 
-  def generate_doc_file(file):
-    namespace_link_list = ""
-    namespace_contents_list = ""
-    docs_text = ""
+  def get_class_rules():
+    rules = []
+    for name, style in HTMLWriter.STYLES.items():
+      declarations = "".join(f"    {declaration};\n" for declaration in style.rstrip(";").split("; "))
+      rules.append(f".{name} {{\n{declarations}}}\n")
+    return "".join(rules)
 
-    for type in DefType:
-      # Write out all namespaces
-      if Writer.can_write_namespace_link_list(type):
-        namespace_link_list += HTMLWriter.write_namespace_link_list(type)
+  def get_stylesheet(self):
+    stylesheet = HTMLWriter.read_stylesheet(HTMLWriter.get_stylesheet_path())
+
+    # Only compact pages use the classes, so default pages don't carry them
+    if self.compact:
+      stylesheet += HTMLWriter.get_class_rules()
 
-      # Write out what's in those namespaces
-      if Writer.can_write_namespace_contents_list(type):
-        namespace_contents_list += HTMLWriter.write_namespace_contents_list(type)
+    return stylesheet
 
-      # Write out docs
-      if Writer.can_write_docs(type):
-        docs_text += HTMLWriter.write_docs(type)
+  def write_stylesheet(self, file):
+    file = self.get_output(file)
+    file.write(self.get_stylesheet())
+
+  def get_output(self, file):
+    if self.compact:
+      return CompactFile(file)
+    return file
+
+  def get_short_anchor(anchor, length):
+    digest = hashlib.sha1(anchor.encode('utf-8')).digest()
+    return base64.b32encode(digest).decode('ascii').lower()[:length]
+
+  def get_anchors(self):
+    anchors = set(NamespaceInfo.get_href(name) for name in self.session.namespaces)
+    for group in self.session.lists:
+      for doc in group.doc_list:
+        anchors.add(doc.get_href())
+    return anchors
+
+  def assign_anchors(self):
+    if not self.short_anchors:
+      return
+
+    # Each id comes from a hash of the anchor, so it stays the same from one build to the next;
+    # the few that clash get a longer one
+    anchors = {}
+    taken = set()
+    for anchor in sorted(self.get_anchors()):
+      length = HTMLWriter.SHORT_ANCHOR_LENGTH
+      short_anchor = HTMLWriter.get_short_anchor(anchor, length)
+      while short_anchor in taken:
+        length += 1
+        short_anchor = HTMLWriter.get_short_anchor(anchor, length)
+
+      anchors[anchor] = short_anchor
+      taken.add(short_anchor)
+
+    self.session.anchors = anchors
+
+  def write_search_box(self, file):
+    if not self.use_search:
+      return
+
+    file.write(f"""<div {self.styles['search']}>
+        <input type="search" id="docgen-search-input" placeholder="Search" {self.styles['search-input']}>
+        <ul id="docgen-search-results" {self.styles['search-results']}></ul>
+    </div>
+    <script src="{SearchIndex.FILENAME}"></script>
+    <script src="{SearchIndex.SCRIPT}" defer></script>
+    """)
+
+  def write_search_files(self, path):
+    SearchIndex.build(self.session, self.get_docs, self.describe).write(path)
+
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SearchIndex.SCRIPT)
+    with open(path / SearchIndex.SCRIPT, 'w', encoding = 'utf-8') as file:
+      file.write(SearchIndex.read_script(script_path))
+
+    self.compress(path / SearchIndex.FILENAME)
+    self.compress(path / SearchIndex.SCRIPT)
+
+  def compress(self, path):
+    if self.compressor is not None:
+      self.compressor.add(path)
+
+  def remove_file(self, path):
+    path.unlink(missing_ok = True)
+    if self.compressor is not None:
+      self.compressor.remove(path)
+
+  def finish_compression(self):
+    if self.compressor is not None:
+      with Profiler.section("compress", "write"):
+        self.compressor.finish()
+      self.compressor.report()
+
+  def write_doc_file(self, path):
+    with path.open(mode='w') as file:
+      self.generate_doc_file(file)
+    self.compress(path)
+
+    if self.use_search:
+      self.write_search_files(path.parent)
+
+    self.finish_compression()
+
+  def generate_doc_file(self, file):
+    self.assign_anchors()
+    file = self.get_output(file)
 
     # Read stylesheet
-    stylesheet_data = HTMLWriter.read_stylesheet("style.css")
+    stylesheet_data = self.get_stylesheet()
 
-    # Write to file
+    # Each section is written out as soon as it's generated
     file.write(f"""<html>
   <head>
     <title>Hatch Game Engine Documentation</title>
@@ -246,14 +407,228 @@ class HTMLWriter:
     </style>
   </head>
   <body>
-    <div style="position: fixed; margin-top: -32px; margin-left: -96px; width: 100%; text-align: right;">
+    <div {self.styles['corner']}>
         <a href="#Reference_top">Back to top</a>
     </div>
     <h1 id="Reference_top">Hatch Game Engine Reference</h1>
-    {namespace_link_list}
-    <hr/>
-    {namespace_contents_list}
-    <hr/>
-    {docs_text}
-  </body>
-</html>""")
+    """)
+
+    self.write_search_box(file)
+
+    # Write out all namespaces
+    with Profiler.section("namespace link list", "write"):
+      for type in DefType:
+        if Writer.can_write_namespace_link_list(self.session, type):
+          self.write_namespace_link_list(file, type)
+
+    file.write("\n    <hr/>\n    ")
+
+    # Write out what's in those namespaces
+    with Profiler.section("namespace contents list", "write"):
+      for type in DefType:
+        if Writer.can_write_namespace_contents_list(self.session, type):
+          self.write_namespace_contents_list(file, type)
+
+    file.write("\n    <hr/>\n    ")
+
+    # Write out docs
+    for type in DefType:
+      if Writer.can_write_docs(self.session, type):
+        with Profiler.section(f"docs: {defTypeNames[type][1]}", "write"):
+          self.write_docs(file, type)
+
+    file.write("\n  </body>\n</html>")
+
+  def get_page_name(namespace_name):
+    return re.sub(r'[^\w.-]', '_', namespace_name) + ".html"
+
+  def is_namespace_page_type(type):
+    # Constants and globals get pages of their own
+    if type == DefType.CONSTANT or type == DefType.GLOBAL_VAR:
+      return False
+
+    return not DefType.is_descriptive(type)
+
+  def assign_pages(self):
+    self.assign_anchors()
+
+    pages = self.session.pages
+    pages.clear()
+
+    for name, namespace_info in self.session.namespaces.items():
+      page = HTMLWriter.get_page_name(name)
+      pages[NamespaceInfo.get_href(name)] = page
+
+      for type in DefType:
+        if HTMLWriter.is_namespace_page_type(type):
+          for doc in namespace_info.docs_per_def[type.value]:
+            pages[doc.get_href()] = page
+
+    for type in [DefType.CLASS, DefType.NAMESPACE]:
+      for doc in self.session.lists[type.value].doc_list:
+        if doc.title in self.session.namespaces:
+          pages[doc.get_href()] = HTMLWriter.get_page_name(doc.title)
+
+    for doc in self.session.lists[DefType.CONSTANT.value].doc_list:
+      pages[doc.get_href()] = HTMLWriter.CONSTANTS_PAGE
+
+    for doc in self.session.lists[DefType.GLOBAL_VAR.value].doc_list:
+      pages[doc.get_href()] = HTMLWriter.GLOBALS_PAGE
+
+  def write_page_header(self, file, title, heading_id, heading):
+    file.write(f"""<html>
+  <head>
+    <title>{title}</title>
+    <link rel="stylesheet" href="{HTMLWriter.STYLESHEET}">
+  </head>
+  <body>
+    <div {self.styles['corner']}>
+        <a href="{HTMLWriter.INDEX_PAGE}">Back to index</a>
+    </div>
+    <h1 id="{heading_id}">{heading}</h1>
+""")
+
+    self.write_search_box(file)
+
+  def write_page_footer(file):
+    file.write("  </body>\n</html>")
+
+  def write_index_page(self, file):
+    file = self.get_output(file)
+    self.write_page_header(file, "Hatch Game Engine Documentation", "Reference_top", "Hatch Game Engine Reference")
+
+    for type in DefType:
+      if Writer.can_write_namespace_link_list(self.session, type):
+        self.write_namespace_link_list(file, type)
+
+    HTMLWriter.write_page_footer(file)
+
+  def write_namespace_page(self, file, namespace_name):
+    file = self.get_output(file)
+    namespace_info = self.session.namespaces[namespace_name]
+
+    title = f"{namespace_name} - Hatch Game Engine Documentation"
+    self.write_page_header(file, title, self.session.get_anchor(NamespaceInfo.get_href(namespace_name)), namespace_name)
+
+    desc_doc = DocDef.find_description(self.session, namespace_name)
+    if desc_doc and desc_doc.description is not None:
+      file.write(self.write_docdef_description(desc_doc))
+
+    self.write_namespace_contents(file, namespace_info)
+
+    file.write("        <hr/>\n")
+
+    for type in DefType:
+      docs = namespace_info.docs_per_def[type.value]
+      if len(docs) == 0 or not HTMLWriter.is_namespace_page_type(type):
+        continue
+
+      group = self.session.lists[type.value]
+
+      file.write(f"        <h3>{defTypeNames[type][1]}</h3>\n")
+
+      for doc in docs:
+        self.write_docdef(file, group, doc, type)
+
+    HTMLWriter.write_page_footer(file)
+
+  def write_list_page(self, file, type):
+    file = self.get_output(file)
+    title = f"{defTypeNames[type][1]} - Hatch Game Engine Documentation"
+    self.write_page_header(file, title, "Reference_" + defTypeNames[type][0], defTypeNames[type][1])
+    self.write_docs(file, type)
+    HTMLWriter.write_page_footer(file)
+
+  def get_links(self):
+    return { title: self.session.get_link(anchor) for title, anchor in self.session.href.items() }
+
+  def add_referring_pages(self, old_links, links, namespaces, types):
+    # Pages that refer to a title whose link changed are out of date too
+    for title in old_links.keys() | links.keys():
+      if old_links.get(title) != links.get(title):
+        for doc in self.session.refs.referenced_by.get(title, ()):
+          RefGraph.get_affected(doc, namespaces, types, set())
+
+  def generate_pages(self, path, namespaces = None, types = None):
+    self.assign_pages()
+
+    if namespaces is None:
+      with open(path / HTMLWriter.STYLESHEET, 'w', encoding = 'utf-8') as file:
+        self.write_stylesheet(file)
+      self.compress(path / HTMLWriter.STYLESHEET)
+
+    # In watch mode, only the pages for changed namespaces and types are written again,
+    # along with the pages that link to anything that moved
+    links = self.get_links()
+    if namespaces is not None and self.written_links is not None:
+      namespaces = set(namespaces)
+      types = set(types)
+      self.add_referring_pages(self.written_links, links, namespaces, types)
+    self.written_links = links
+
+    for namespace_name in self.session.namespaces:
+      if namespaces is not None and not namespace_name in namespaces:
+        continue
+      with Profiler.section(f"page: {namespace_name}", "write"):
+        with open(path / HTMLWriter.get_page_name(namespace_name), 'w') as file:
+          self.write_namespace_page(file, namespace_name)
+        self.compress(path / HTMLWriter.get_page_name(namespace_name))
+
+    if namespaces is not None:
+      for namespace_name in namespaces:
+        if not namespace_name in self.session.namespaces:
+          self.remove_file(path / HTMLWriter.get_page_name(namespace_name))
+
+    for type, page in [(DefType.CONSTANT, HTMLWriter.CONSTANTS_PAGE), (DefType.GLOBAL_VAR, HTMLWriter.GLOBALS_PAGE)]:
+      if types is not None and not type in types:
+        continue
+      if Writer.can_write_docs(self.session, type):
+        with open(path / page, 'w') as file:
+          self.write_list_page(file, type)
+        self.compress(path / page)
+      else:
+        self.remove_file(path / page)
+
+    with open(path / HTMLWriter.INDEX_PAGE, 'w') as file:
+      self.write_index_page(file)
+    self.compress(path / HTMLWriter.INDEX_PAGE)
+
+    if self.use_search:
+      self.write_search_files(path)
+
+    self.finish_compression()
+
+# Leaves out the line breaks and indentation between tags.
+# Descriptions never span lines, so the text itself isn't touched
+class CompactFile:
+  PATTERN = re.compile(r'\n\s*')
+
+  def __init__(self, file):
+    self.file = file
+
+  def write(self, text):
+    self.file.write(CompactFile.PATTERN.sub('', text.lstrip(' ')))
+
+class HTMLSink:
+  def __init__(self, writer, path, split = False):
+    self.writer = writer
+    self.path = path
+    self.split = split
+
+  def begin(self, visitor):
+    # Links depend on which page each definition ends up on
+    if self.split:
+      self.writer.assign_pages()
+    else:
+      self.writer.assign_anchors()
+
+  def visit(self, doc, type):
+    # Pages are written in namespace order, not visit order, so each definition is rendered as it's streamed out
+    pass
+
+  def finish(self):
+    if self.split:
+      self.path.mkdir(parents = True, exist_ok = True)
+      self.writer.generate_pages(self.path)
+    else:
+      self.writer.write_doc_file(self.path)
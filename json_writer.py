@@ -0,0 +1,84 @@
+import json, functools
+
+from enums import DefType
+from doc_def import FunctionDef, EnumDef, ConstantDef, FieldDef
+from writer import Writer
+
+# Writes one JSON object per definition, one per line (NDJSON)
+class JSONWriter:
+  def __init__(self, session):
+    self.session = session
+    self.describe = functools.partial(Writer.process_description, session = session)
+
+  def get_param(self, param):
+    record = {
+      "label": param.label,
+      "type": Writer.process_type(param.type),
+      "description": param.description,
+      "optional": param.optional
+    }
+
+    if param.default_value is not None:
+      record["default"] = param.default_value
+
+    return record
+
+  def get_record(self, doc, type):
+    record = {
+      "type": type.name.lower(),
+      "title": doc.get_title(),
+      "name": doc.title,
+      "href": doc.get_href()
+    }
+
+    if doc.namespace is not None:
+      record["namespace"] = doc.namespace
+
+    # The description as written, and as plain text with the markup taken out
+    if doc.description is not None:
+      record["description"] = doc.description
+      record["text"] = self.describe(doc.description, False, False, False)
+
+    if doc.deprecated is not None:
+      record["deprecated"] = doc.deprecated
+
+    if isinstance(doc, FunctionDef):
+      record["params"] = [self.get_param(param) for param in doc.params]
+      record["return_type"] = doc.return_type
+      if doc.returns is not None:
+        record["returns"] = doc.returns
+    elif isinstance(doc, EnumDef):
+      if doc.prefix is not None:
+        record["prefix"] = doc.prefix
+    elif isinstance(doc, ConstantDef):
+      if doc.value_type is not None:
+        record["value_type"] = doc.value_type
+      if isinstance(doc, FieldDef) and doc.default_value is not None:
+        record["default"] = doc.default_value
+
+    return record
+
+  def write_doc(self, file, doc, type):
+    file.write(json.dumps(self.get_record(doc, type), ensure_ascii = False))
+    file.write("\n")
+
+  def generate_file(self, file):
+    for type in DefType:
+      for doc in self.session.lists[type.value].doc_list:
+        self.write_doc(file, doc, type)
+
+class JSONSink:
+  def __init__(self, writer, path):
+    self.writer = writer
+    self.path = path
+    self.file = None
+
+  def begin(self, visitor):
+    self.file = open(self.path, 'w', encoding = 'utf-8')
+
+  def visit(self, doc, type):
+    self.writer.write_doc(self.file, doc, type)
+
+  def finish(self):
+    self.file.close()
+    self.file = None
@@ -0,0 +1,53 @@
+import re
+
+from marker import Marker
+
+class Token:
+  def __init__(self, directive, value, line_num):
+    self.directive = directive
+    self.value = value
+    self.line_num = line_num
+
+class Lexer:
+  DIRECTIVE_PATTERN = re.compile(r'\* \\(\w+)')
+
+  def tokenize(lines, start = 0):
+    tokens = []
+    line_num = start
+    num_lines = len(lines)
+
+    while line_num < num_lines:
+      line = lines[line_num].strip()
+      token_line_num = line_num
+      line_num += 1
+
+      if line.startswith(Marker.DEF_END):
+        break
+
+      match = Lexer.DIRECTIVE_PATTERN.match(line)
+      if not match:
+        continue
+
+      directive = match.group(1)
+      value = line[match.end():].strip()
+
+      # Consume continuation lines, so they're never looked at again
+      if directive in Marker.multiline:
+        while value.endswith("\\") and line_num < num_lines:
+          value = value[:-1] + lines[line_num].strip()
+          line_num += 1
+
+      tokens.append(Token(directive, value, token_line_num))
+
+    return tokens
+
+  def get_header(line):
+    match = Lexer.DIRECTIVE_PATTERN.match(line)
+    if not match:
+      return None, None
+
+    def_type = Marker.def_types.get(match.group(1))
+    if def_type is None:
+      return None, None
+
+    return def_type, line[match.end():].strip()
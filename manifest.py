@@ -0,0 +1,70 @@
+import os, json, hashlib
+import concurrent.futures
+
+from sys import stderr
+
+class OutputManifest:
+  FILENAME = ".docgen-manifest.json"
+
+  def __init__(self, path):
+    self.path = path
+    self.old_digests = {}
+    self.digests = {}
+    self.written = 0
+    self.unchanged = 0
+    self.removed = 0
+
+    try:
+      with open(path / OutputManifest.FILENAME, 'r', encoding = 'utf-8') as file:
+        self.old_digests = json.load(file)
+    except (OSError, ValueError):
+      pass
+
+  def get_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+  def is_unchanged(self, filename, digest):
+    return self.old_digests.get(filename) == digest and (self.path / filename).is_file()
+
+  def write_text(self, filename, text):
+    with open(self.path / filename, 'w') as file:
+      file.write(text)
+
+  def write_files(self, files, jobs = 1):
+    changed = []
+
+    for filename, text in files.items():
+      digest = OutputManifest.get_digest(text)
+      self.digests[filename] = digest
+
+      # Leave the file alone, so its mtime doesn't change
+      if self.is_unchanged(filename, digest):
+        self.unchanged += 1
+      else:
+        changed.append((filename, text))
+
+    if jobs > 1 and len(changed) > 1:
+      with concurrent.futures.ThreadPoolExecutor(max_workers = jobs) as executor:
+        for _ in executor.map(lambda item: self.write_text(*item), changed):
+          pass
+    else:
+      for filename, text in changed:
+        self.write_text(filename, text)
+
+    self.written += len(changed)
+
+  def finish(self):
+    # Remove files written by a previous run that weren't written this time
+    for filename in self.old_digests:
+      if not filename in self.digests:
+        try:
+          os.remove(self.path / filename)
+          self.removed += 1
+        except FileNotFoundError:
+          pass
+
+    with open(self.path / OutputManifest.FILENAME, 'w', encoding = 'utf-8') as file:
+      json.dump(self.digests, file, indent = 0, sort_keys = True)
+
+  def report(self, file = stderr):
+    file.write(f"docgen: {self.written} written, {self.unchanged} unchanged, {self.removed} removed\n")
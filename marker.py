@@ -3,10 +3,14 @@ from enums import DefType
 class Marker:
   DEF_START = "/***"
   DEF_END = "*/"
+  PREFIX = "* \\"
 
   def make(str):
     return "* \\" + str
 
+  def get_directive(marker):
+    return marker[len(Marker.PREFIX):]
+
   METHOD = make("method")
   CONSTRUCTOR = make("constructor")
   CONSTANT = make("constant")
@@ -38,20 +42,17 @@ class Marker:
     (NAMESPACE, DefType.NAMESPACE)
   ]
 
-  def get(marker, line):
-    return line[len(marker):].strip()
-
-  def get_multiline(marker, lines, line_num = 0):
-    if line_num > 0:
-      lines = lines[line_num:]
-
-    result = Marker.get(marker, lines[0])
-    cur_line = 1
-
-    while result.endswith("\\"):
-      if cur_line == len(lines):
-        break
-      result = result[0:(len(result)) - 1] + lines[cur_line].strip()
-      cur_line += 1
+# Markers whose text can continue on the next line by ending with a backslash
+Marker.multiline = {
+  Marker.get_directive(marker) for marker in [
+    Marker.DESC,
+    Marker.DEPRECATED,
+    Marker.PARAM,
+    Marker.PARAM_OPT,
+    Marker.RETURN
+  ]
+}
 
-    return result, cur_line
+Marker.def_types = {
+  Marker.get_directive(marker): def_type for marker, def_type in Marker.to_def_type
+}
@@ -0,0 +1,103 @@
+import re, functools
+
+class Markup:
+  TEXT = 0
+  CODE = 1
+  REF = 2
+  PARAM = 3
+
+  CACHE_SIZE = 16384
+
+  PATTERN = re.compile(r'`(?P<code>[^`]*)`|<ref (?P<ref>.*?)>|<param (?P<param>.*?)>')
+  INNER_PATTERN = re.compile(r'<ref (?P<ref>.*?)>|<param (?P<param>.*?)>')
+
+  def tokenize(text, pattern):
+    tokens = []
+    pos = 0
+
+    for match in pattern.finditer(text):
+      start = match.start()
+      if start > pos:
+        tokens.append((Markup.TEXT, text[pos:start]))
+
+      kind = match.lastgroup
+      value = match.group(kind)
+      if kind == 'code':
+        # References inside code are still turned into links
+        tokens.append((Markup.CODE, Markup.tokenize(value, Markup.INNER_PATTERN)))
+      elif kind == 'ref':
+        tokens.append((Markup.REF, value))
+      else:
+        tokens.append((Markup.PARAM, value))
+
+      pos = match.end()
+
+    if pos < len(text):
+      tokens.append((Markup.TEXT, text[pos:]))
+
+    return tuple(tokens)
+
+  @functools.lru_cache(maxsize = CACHE_SIZE)
+  def compile(text):
+    return Markup.tokenize(text, Markup.PATTERN)
+
+  def render_ref(name, is_doxygen):
+    replaced = name.replace('_*', '')
+    if is_doxygen:
+      return f"\\ref {replaced}"
+    return replaced
+
+  def render_link(session, name):
+    href = session.href.get(name)
+    if href is not None:
+      return f"<a href=\"{session.get_link(href)}\">{name}</a>"
+    return name
+
+  def render_param(name, is_doxygen, use_html_links):
+    if is_doxygen:
+      return f"\\a {name}"
+    elif use_html_links:
+      return f"<code>{name}</code>"
+    return name
+
+  def add_text(parts, text):
+    if parts and isinstance(parts[-1], str):
+      parts[-1] += text
+    else:
+      parts.append(text)
+
+  def layout_tokens(parts, tokens, is_doxygen, use_html_code, use_html_links):
+    for kind, value in tokens:
+      if kind == Markup.TEXT:
+        Markup.add_text(parts, value)
+      elif kind == Markup.REF:
+        if use_html_links:
+          # Filled in for each session by render
+          parts.append((value,))
+        else:
+          Markup.add_text(parts, Markup.render_ref(value, is_doxygen))
+      elif kind == Markup.PARAM:
+        Markup.add_text(parts, Markup.render_param(value, is_doxygen, use_html_links))
+      else:
+        Markup.add_text(parts, "<code>" if use_html_code else "`")
+        Markup.layout_tokens(parts, value, is_doxygen, use_html_code, use_html_links)
+        Markup.add_text(parts, "</code>" if use_html_code else "`")
+
+  # Everything but the links, which are the only part that depends on the session.
+  # Keeping sessions out of the cache means it never holds an old model alive.
+  @functools.lru_cache(maxsize = CACHE_SIZE)
+  def layout(text, is_doxygen, use_html_code, use_html_links):
+    parts = []
+    Markup.layout_tokens(parts, Markup.compile(text), is_doxygen, use_html_code, use_html_links)
+    return tuple(parts)
+
+  def render(session, text, is_doxygen, use_html_code, use_html_links):
+    parts = Markup.layout(text, is_doxygen, use_html_code, use_html_links)
+    if len(parts) == 1 and isinstance(parts[0], str):
+      return parts[0]
+
+    return "".join(part if isinstance(part, str) else Markup.render_link(session, part[0]) for part in parts)
+
+  def clear_cache():
+    Markup.compile.cache_clear()
+    Markup.layout.cache_clear()
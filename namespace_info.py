@@ -1,10 +1,8 @@
-import doc_globals
+import bisect
 
 from enums import DefType, defTypeNames
 
 class NamespaceInfo:
-  all = {}
-
   def __init__(self):
     self.is_enum_namespace = False
     self.docs_per_def = None
@@ -18,9 +16,9 @@ class NamespaceInfo:
 
     return defTypeNames[type][1]
 
-  def get(name):
-    if name in NamespaceInfo.all:
-      return NamespaceInfo.all[name]
+  def get(session, name):
+    if name in session.namespaces:
+      return session.namespaces[name]
 
     ns_info = NamespaceInfo()
     ns_info.docs_per_def = {}
@@ -28,28 +26,59 @@ class NamespaceInfo:
     for type in DefType:
       ns_info.docs_per_def[type.value] = []
 
-    NamespaceInfo.all[name] = ns_info
-    doc_globals.href[name] = NamespaceInfo.get_href(name)
+    session.namespaces[name] = ns_info
+    session.href[name] = NamespaceInfo.get_href(name)
 
     return ns_info
 
-  def add_for_doc_def(group, doc_def):
+  def add_doc(self, doc_def, order = None):
+    docs = self.docs_per_def[doc_def.type.value]
+    if order is None:
+      docs.append(doc_def)
+    else:
+      bisect.insort(docs, doc_def, key = order)
+
+  def remove_doc(session, name, doc_def):
+    ns_info = session.namespaces.get(name)
+    if ns_info is None:
+      return
+
+    ns_info.docs_per_def[doc_def.type.value].remove(doc_def)
+
+    # Drop namespaces that have nothing left in them
+    if not any(ns_info.docs_per_def.values()):
+      del session.namespaces[name]
+      if session.href.get(name) == NamespaceInfo.get_href(name):
+        del session.href[name]
+
+  def add_for_doc_def(session, group, doc_def, order = None):
+    name = doc_def.namespace
+    if name == None:
+      if doc_def.type == DefType.ENUM:
+        group.add_prefix(doc_def, order)
+      return
+
+    group.add_namespace(doc_def, order)
+
+    ns_info = NamespaceInfo.get(session, name)
+    ns_info.add_doc(doc_def, order)
+
+  def remove_for_doc_def(session, group, doc_def, order = None):
     name = doc_def.namespace
     if name == None:
       if doc_def.type == DefType.ENUM:
-        group.add_prefix(doc_def)
+        group.remove_prefix(doc_def, order)
       return
 
-    group.add_namespace(doc_def)
+    group.remove_namespace(doc_def, order)
 
-    ns_info = NamespaceInfo.get(name)
-    ns_info.docs_per_def[doc_def.type.value].append(doc_def)
+    NamespaceInfo.remove_doc(session, name, doc_def)
 
-  def get_for_enum(name):
-    if name in NamespaceInfo.all:
-      return NamespaceInfo.all[name]
+  def get_for_enum(session, name):
+    if name in session.namespaces:
+      return session.namespaces[name]
 
-    ns_info = NamespaceInfo.get(name)
+    ns_info = NamespaceInfo.get(session, name)
     ns_info.is_enum_namespace = True
 
     return ns_info
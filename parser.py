@@ -1,108 +1,126 @@
-import re
+import re, sys
 import xml.etree.ElementTree as ET
 
-from enums import DefType
+from enums import DefType, defTypeNames
 from doc_def import DocDef, FunctionDef, ParamDef, EnumDef, ConstantDef, FieldDef
-from marker import Marker
-
-import doc_globals
+from lexer import Lexer
 
 class Parser:
   REF_PATTERN = r'<ref (.*?)>'
+  REF_REGEX = re.compile(REF_PATTERN)
 
   HTML_BREAK_STR = '<br/>'
 
-  def parse_base_def_marker(doc_def, line, lines, line_num):
-    if line.startswith(Marker.DESC):
-      description, num_lines = Marker.get_multiline(Marker.DESC, lines, line_num)
-      description = description.strip()
-      if len(description) == 0:
-        description = None
-      doc_def.description = description
-      return num_lines
-    elif line.startswith(Marker.DEPRECATED):
-      deprecated, num_lines = Marker.get_multiline(Marker.DEPRECATED, lines, line_num)
-      doc_def.deprecated = deprecated.strip()
-      return num_lines
-    elif line.startswith(Marker.NS):
-      doc_def.namespace = Marker.get(Marker.NS, line)
-      return 0
-
-    return None
-
-  def parse_function_def(title, type, lines):
+  def parse_description(doc_def, value):
+    description = value.strip()
+    if len(description) == 0:
+      description = None
+    doc_def.description = description
+
+  def parse_deprecated(doc_def, value):
+    doc_def.deprecated = value.strip()
+
+  def parse_namespace(doc_def, value):
+    doc_def.namespace = sys.intern(value)
+
+  def add_param(doc_def, value, optional):
+    try:
+      doc_def.params.append(ParamDef(value, optional))
+    except ValueError as error:
+      doc_def.add_problem("malformed-param", f"Skipped parameter with {error}")
+
+  def parse_param(doc_def, value):
+    Parser.add_param(doc_def, value, False)
+
+  def parse_param_opt(doc_def, value):
+    Parser.add_param(doc_def, value, True)
+
+  def parse_return(doc_def, value):
+    result = value
+    match = Parser.REF_REGEX.search(result.strip())
+    if match:
+      start, end = match.span()
+      if start == 0:
+        result = result[:start] + result[end:]
+        doc_def.return_type = sys.intern(Parser.parse_ref(match.group(0)))
+        doc_def.returns = result.strip()
+      else:
+        match = None
+    if not match:
+      split_result = result.split(maxsplit = 1)
+      if len(split_result):
+        doc_def.return_type = sys.intern(split_result[0])
+        doc_def.returns = split_result[1]
+      else:
+        doc_def.returns = result
+
+  def parse_constant_type(doc_def, value):
+    doc_def.value_type = sys.intern(value)
+
+  def parse_field_type(doc_def, value):
+    doc_def.value_type = sys.intern(Parser.parse_ref(value))
+
+  def parse_default(doc_def, value):
+    doc_def.default_value = value
+
+  base_handlers = {
+    "desc": parse_description,
+    "deprecated": parse_deprecated,
+    "ns": parse_namespace
+  }
+
+  function_handlers = {
+    **base_handlers,
+    "paramOpt": parse_param_opt,
+    "param": parse_param,
+    "return": parse_return
+  }
+
+  constant_handlers = {
+    **base_handlers,
+    "type": parse_constant_type
+  }
+
+  field_handlers = {
+    **base_handlers,
+    "type": parse_field_type,
+    "default": parse_default
+  }
+
+  def parse_tokens(doc_def, tokens, handlers):
+    for token in tokens:
+      handler = handlers.get(token.directive)
+      if handler:
+        handler(doc_def, token.value)
+      else:
+        doc_def.add_problem("unknown-marker", f"Ignored \\{token.directive}, which isn't a marker for {defTypeNames[doc_def.type][0]}")
+
+  def parse_function_def(title, type, tokens):
     doc_def = FunctionDef()
     doc_def.title = title
     doc_def.type = type
 
-    for line_num, line in enumerate(lines):
-      line = line.strip()
-      if line.startswith(Marker.DEF_END):
-        break
-
-      num_lines = Parser.parse_base_def_marker(doc_def, line, lines, line_num)
-      if num_lines is None:
-        # paramOpt
-        if line.startswith(Marker.PARAM_OPT):
-          result, num_lines = Marker.get_multiline(Marker.PARAM_OPT, lines, line_num)
-          param_opt = ParamDef(result, True)
-          doc_def.params.append(param_opt)
-        # param
-        elif line.startswith(Marker.PARAM):
-          result, num_lines = Marker.get_multiline(Marker.PARAM, lines, line_num)
-          param = ParamDef(result, False)
-          doc_def.params.append(param)
-        # return
-        elif line.startswith(Marker.RETURN):
-          result, num_lines = Marker.get_multiline(Marker.RETURN, lines, line_num)
-          match = re.search(Parser.REF_PATTERN, result.strip())
-          if match:
-            start, end = match.span()
-            if start == 0:
-              result = result[:start] + result[end:]
-              doc_def.return_type = Parser.parse_ref(match.group(0))
-              doc_def.returns = result.strip()
-            else:
-              match = None
-          if not match:
-            split_result = result.split(maxsplit = 1)
-            if len(split_result):
-              doc_def.return_type = split_result[0]
-              doc_def.returns = split_result[1]
-            else:
-              doc_def.returns = result
-
-      line_num += num_lines or 0
+    Parser.parse_tokens(doc_def, tokens, Parser.function_handlers)
 
     if type == DefType.CONSTRUCTOR:
       doc_def.title = doc_def.namespace
 
     return doc_def
 
-  def parse_generic_def(title, type, lines):
+  def parse_generic_def(title, type, tokens):
     doc_def = DocDef()
     doc_def.title = title
     doc_def.type = type
 
-    for line_num, line in enumerate(lines):
-      line = line.strip()
-      if line.startswith(Marker.DEF_END):
-        break
-
-      line_num += Parser.parse_base_def_marker(doc_def, line, lines, line_num) or 0
+    Parser.parse_tokens(doc_def, tokens, Parser.base_handlers)
 
     return doc_def
 
-  def parse_enum_def(title, lines):
+  def parse_enum_def(title, tokens):
     doc_def = EnumDef()
     doc_def.title = title
 
-    for line_num, line in enumerate(lines):
-      line = line.strip()
-      if line.startswith(Marker.DEF_END):
-        break
-
-      line_num += Parser.parse_base_def_marker(doc_def, line, lines, line_num) or 0
+    Parser.parse_tokens(doc_def, tokens, Parser.base_handlers)
 
     pos = title.find('_')
     if pos != -1:
@@ -110,57 +128,34 @@ class Parser:
 
     return doc_def
 
-  def parse_constant_def(title, lines):
+  def parse_constant_def(title, tokens):
     doc_def = ConstantDef()
     doc_def.title = title
 
-    for line_num, line in enumerate(lines):
-      line = line.strip()
-      if line.startswith(Marker.DEF_END):
-        break
-
-      num_lines = Parser.parse_base_def_marker(doc_def, line, lines, line_num)
-      if num_lines is not None:
-        line_num += num_lines
-      # type
-      elif line.startswith(Marker.TYPE):
-        doc_def.value_type = Marker.get(Marker.TYPE, line)
+    Parser.parse_tokens(doc_def, tokens, Parser.constant_handlers)
 
     return doc_def
 
-  def parse_field_def(title, type, lines):
+  def parse_field_def(title, type, tokens):
     doc_def = FieldDef()
     doc_def.title = title
     doc_def.type = type
 
-    for line_num, line in enumerate(lines):
-      line = line.strip()
-      if line.startswith(Marker.DEF_END):
-        break
-
-      num_lines = Parser.parse_base_def_marker(doc_def, line, lines, line_num)
-      if num_lines is not None:
-        line_num += num_lines
-      # type
-      elif line.startswith(Marker.TYPE):
-        doc_def.value_type = Parser.parse_ref(Marker.get(Marker.TYPE, line))
-      # default
-      elif line.startswith(Marker.DEFAULT):
-        doc_def.default_value = Marker.get(Marker.DEFAULT, line)
+    Parser.parse_tokens(doc_def, tokens, Parser.field_handlers)
 
     return doc_def
 
-  def parse_def(title, type, lines):
+  def parse_def(title, type, tokens):
     if type == DefType.FUNCTION or type == DefType.METHOD or type == DefType.CONSTRUCTOR:
-      return Parser.parse_function_def(title, type, lines)
+      return Parser.parse_function_def(title, type, tokens)
     elif type == DefType.ENUM:
-        return Parser.parse_enum_def(title, lines)
+        return Parser.parse_enum_def(title, tokens)
     elif type == DefType.CONSTANT:
-      return Parser.parse_constant_def(title, lines)
+      return Parser.parse_constant_def(title, tokens)
     elif type == DefType.FIELD or type == DefType.CLASS_FIELD:
-      return Parser.parse_field_def(title, type, lines)
+      return Parser.parse_field_def(title, type, tokens)
 
-    return Parser.parse_generic_def(title, type, lines)
+    return Parser.parse_generic_def(title, type, tokens)
 
   def parse_doc_lines(lines):
     if len(lines) == 0:
@@ -168,53 +163,28 @@ class Parser:
 
     first_line = lines[0]
 
-    for key, value in Marker.to_def_type:
-      if first_line.startswith(key):
-        title = first_line[len(key):].strip()
-        return Parser.parse_def(title, value, lines)
+    type, title = Lexer.get_header(first_line)
+    if type is not None:
+      return Parser.parse_def(title, type, Lexer.tokenize(lines, 1))
 
     # Assume it's a function
     title = first_line[1:].strip()
     if len(title) == 0:
       return None
 
-    return Parser.parse_function_def(title, DefType.FUNCTION, lines[1:])
-
-  def parse_ref(input, use_doxygen_refs = False, use_html_links = False):
-    if input is None:
-      return None
-
-    def convert_fn(match):
-      match = match.group(1)
-      if use_html_links:
-        if match in doc_globals.href:
-          return f"<a href=\"#{doc_globals.href[match]}\">{match}</a>"
-        else:
-          return match
-      else:
-        replaced = match.replace('_*', '')
-        if use_doxygen_refs:
-          return f"\\ref {replaced}"
-        else:
-          return replaced
-
-    output = re.sub(Parser.REF_PATTERN, convert_fn, input)
-
-    return output
+    return Parser.parse_function_def(title, DefType.FUNCTION, Lexer.tokenize(lines, 1))
 
-  def parse_param_ref(input, is_doxygen, use_html_code):
+  def parse_ref(input, use_doxygen_refs = False):
     if input is None:
       return None
 
     def convert_fn(match):
-      match = match.group(1)
-      if is_doxygen:
-        return f"\\a {match}"
-      elif use_html_code:
-        return f"<code>{match}</code>"
+      replaced = match.group(1).replace('_*', '')
+      if use_doxygen_refs:
+        return f"\\ref {replaced}"
       else:
-        return match
+        return replaced
 
-    output = re.sub(r'<param (.*?)>', convert_fn, input)
+    output = Parser.REF_REGEX.sub(convert_fn, input)
 
     return output
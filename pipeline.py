@@ -0,0 +1,85 @@
+from collections import Counter
+
+from marker import Marker
+from scanner import Scanner
+from parser import Parser
+from walker import Walker
+from doc_def import DocDef
+from json_writer import JSONWriter
+
+class Block:
+  __slots__ = ('path', 'line', 'lines')
+
+  def __init__(self, path, line, lines):
+    self.path = path
+    self.line = line
+    self.lines = lines
+
+# Reading documentation as a chain of generators: paths, then blocks, then definitions,
+# then sinks. Each stage only holds on to one file or block at a time.
+class Pipeline:
+  def paths(input_paths, walker = None):
+    return (walker or Walker()).find(input_paths)
+
+  def split_blocks(lines, first_line = 1):
+    is_parsing_doc = False
+    doc_lines = []
+    start = first_line
+
+    for line_num, line_in_file in enumerate(lines, first_line):
+      line = line_in_file.strip()
+
+      if line.startswith(Marker.DEF_START):
+        is_parsing_doc = True
+        start = line_num
+        continue
+      elif line.startswith(Marker.DEF_END):
+        if doc_lines:
+          yield start, doc_lines
+        doc_lines = []
+        is_parsing_doc = False
+      elif is_parsing_doc:
+        doc_lines.append(line)
+
+  def blocks(paths):
+    for path in paths:
+      for first_line, lines in Scanner.scan_blocks(path):
+        for line, doc_lines in Pipeline.split_blocks(lines, first_line):
+          yield Block(path, line, doc_lines)
+
+  def parse(blocks):
+    for block in blocks:
+      doc_def = Parser.parse_doc_lines(block.lines)
+      if doc_def:
+        yield doc_def
+
+  def run(doc_defs, sinks):
+    for doc_def in doc_defs:
+      for sink in sinks:
+        sink.add(doc_def)
+
+    return sinks
+
+# Adds definitions to a session, like a regular run does
+class RegistrySink:
+  def __init__(self, session):
+    self.session = session
+
+  def add(self, doc_def):
+    DocDef.add(self.session, doc_def)
+
+# Writes each definition as a line of JSON as soon as it's parsed
+class NDJSONSink:
+  def __init__(self, file):
+    self.file = file
+    self.writer = JSONWriter(None)
+
+  def add(self, doc_def):
+    self.writer.write_doc(self.file, doc_def, doc_def.type)
+
+class CounterSink:
+  def __init__(self):
+    self.counts = Counter()
+
+  def add(self, doc_def):
+    self.counts[doc_def.type] += 1
@@ -0,0 +1,135 @@
+import os, time, json, contextlib
+
+from sys import stderr
+
+class ProfilerSection:
+  def __init__(self, name, category):
+    self.name = name
+    self.category = category
+
+  def __enter__(self):
+    self.start = time.perf_counter()
+    self.cpu_start = time.process_time()
+    return self
+
+  def __exit__(self, *exc_info):
+    wall = time.perf_counter() - self.start
+    cpu = time.process_time() - self.cpu_start
+    Profiler.add_section(self.name, self.category, self.start, wall, cpu)
+    return False
+
+class Profiler:
+  enabled = False
+  origin = 0
+  sections = []
+  files = []
+
+  # Returned when profiling is off, so timed code only pays for a function call
+  NULL_SECTION = contextlib.nullcontext()
+
+  PHASES = ["read", "parse", "process", "write"]
+
+  def enable():
+    Profiler.enabled = True
+    Profiler.origin = time.perf_counter()
+    Profiler.sections.clear()
+    Profiler.files.clear()
+
+  def section(name, category = "phase"):
+    if not Profiler.enabled:
+      return Profiler.NULL_SECTION
+
+    return ProfilerSection(name, category)
+
+  def add_section(name, category, start, wall, cpu):
+    Profiler.sections.append((name, category, start, wall, cpu, os.getpid()))
+
+  def time_file(path, read_fn, parse_fn):
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    lines = read_fn(path)
+
+    parse_start = time.perf_counter()
+    parse_cpu_start = time.process_time()
+
+    doc_defs = parse_fn(lines)
+
+    timings = (
+      start,
+      parse_start - start,
+      parse_cpu_start - cpu_start,
+      time.perf_counter() - parse_start,
+      time.process_time() - parse_cpu_start,
+      os.getpid()
+    )
+
+    return doc_defs, timings
+
+  def add_file(path, blocks, timings):
+    Profiler.files.append((path, blocks, *timings))
+
+  def get_phase_times():
+    phases = { phase: [0.0, 0.0] for phase in Profiler.PHASES }
+
+    for _, _, _, read_wall, read_cpu, parse_wall, parse_cpu, _ in Profiler.files:
+      phases["read"][0] += read_wall
+      phases["read"][1] += read_cpu
+      phases["parse"][0] += parse_wall
+      phases["parse"][1] += parse_cpu
+
+    for name, category, _, wall, cpu, _ in Profiler.sections:
+      if category == "phase" and name in phases:
+        phases[name][0] += wall
+        phases[name][1] += cpu
+
+    return phases
+
+  def report(slowest = 10, file = stderr):
+    file.write(f"{'Phase':<40}{'Wall':>10}{'CPU':>10}\n")
+
+    for phase, (wall, cpu) in Profiler.get_phase_times().items():
+      file.write(f"{phase:<40}{wall:>9.4f}s{cpu:>9.4f}s\n")
+
+    file.write(f"\n{'Writer section':<40}{'Wall':>10}{'CPU':>10}\n")
+
+    for name, category, _, wall, cpu, _ in Profiler.sections:
+      if category == "write":
+        file.write(f"{name:<40}{wall:>9.4f}s{cpu:>9.4f}s\n")
+
+    by_time = sorted(Profiler.files, key = lambda entry: entry[3] + entry[5], reverse = True)
+
+    file.write(f"\nSlowest {min(slowest, len(by_time))} of {len(by_time)} parsed files:\n")
+
+    for path, blocks, _, read_wall, _, parse_wall, _, _ in by_time[:slowest]:
+      file.write(f"{read_wall + parse_wall:>9.4f}s {blocks:>6} blocks  {path}\n")
+
+  def get_trace_events():
+    events = []
+
+    def add_event(name, category, start, wall, tid, args = None):
+      event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": (start - Profiler.origin) * 1000000,
+        "dur": wall * 1000000,
+        "pid": 0,
+        "tid": tid
+      }
+      if args:
+        event["args"] = args
+      events.append(event)
+
+    for name, category, start, wall, _, tid in Profiler.sections:
+      add_event(name, category, start, wall, tid)
+
+    for path, blocks, start, read_wall, _, parse_wall, _, tid in Profiler.files:
+      add_event(f"read {path}", "read", start, read_wall, tid)
+      add_event(f"parse {path}", "parse", start + read_wall, parse_wall, tid, { "blocks": blocks })
+
+    return events
+
+  def write_trace(path):
+    with open(path, 'w') as file:
+      json.dump({ "traceEvents": Profiler.get_trace_events() }, file)
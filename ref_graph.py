@@ -0,0 +1,125 @@
+from sys import stderr
+
+from enums import DefType
+from doc_def import FunctionDef, ConstantDef
+from markup import Markup
+
+# Every reference a definition makes, resolved once after the model is built.
+# An edge is (name, where, is_ref): return and field types are plain names,
+# so they only count when something with that name is documented.
+class RefGraph:
+  def __init__(self, session):
+    self.session = session
+
+    # Outgoing edges of each definition, by id
+    self.edges = {}
+
+    # Definitions that refer to each name
+    self.referenced_by = {}
+
+  def find_refs(tokens):
+    for kind, value in tokens:
+      if kind == Markup.REF:
+        yield value
+      elif kind == Markup.CODE:
+        yield from RefGraph.find_refs(value)
+
+  def add_text_edges(edges, text, where):
+    if text is None:
+      return
+
+    for name in RefGraph.find_refs(Markup.compile(text)):
+      edges.append((name, where, True))
+
+  def get_edges(doc_def):
+    edges = []
+
+    RefGraph.add_text_edges(edges, doc_def.description, "description")
+    RefGraph.add_text_edges(edges, doc_def.deprecated, "deprecation note")
+
+    if isinstance(doc_def, FunctionDef):
+      for param in doc_def.params:
+        RefGraph.add_text_edges(edges, param.type, f"type of param {param.label}")
+        RefGraph.add_text_edges(edges, param.description, f"description of param {param.label}")
+      RefGraph.add_text_edges(edges, doc_def.returns, "return description")
+      edges.append((doc_def.return_type, "return type", False))
+    elif isinstance(doc_def, ConstantDef) and doc_def.value_type is not None:
+      edges.append((doc_def.value_type, "type", False))
+
+    return edges
+
+  def get_names(self, doc_def):
+    names = {}
+    for name, where, is_ref in self.edges.get(id(doc_def), ()):
+      names[name] = True
+    return names.keys()
+
+  def add(self, doc_def):
+    self.edges[id(doc_def)] = RefGraph.get_edges(doc_def)
+
+    for name in self.get_names(doc_def):
+      self.referenced_by.setdefault(name, []).append(doc_def)
+
+  def remove(self, doc_def):
+    for name in self.get_names(doc_def):
+      docs = self.referenced_by[name]
+      docs.remove(doc_def)
+      if len(docs) == 0:
+        del self.referenced_by[name]
+
+    del self.edges[id(doc_def)]
+
+  def build(session):
+    graph = RefGraph(session)
+
+    for group in session.lists:
+      for doc_def in group.doc_list:
+        graph.add(doc_def)
+
+    return graph
+
+  # The namespaces, types and titles whose output shows a definition
+  def get_affected(doc_def, namespaces, types, titles):
+    types.add(doc_def.type)
+    titles.add(doc_def.get_title())
+
+    if doc_def.namespace is not None:
+      namespaces.add(doc_def.namespace)
+      titles.add(doc_def.namespace)
+    elif doc_def.type == DefType.ENUM and doc_def.prefix is not None:
+      namespaces.add(doc_def.prefix)
+      titles.add(doc_def.prefix)
+    elif DefType.is_descriptive(doc_def.type):
+      namespaces.add(doc_def.title)
+
+  def resolve(self, name):
+    return self.session.href.get(name)
+
+  def get_referenced_by(self, doc_def):
+    # Only the definition a title links to lists what refers to it
+    title = doc_def.get_title()
+    if self.resolve(title) != doc_def.get_href():
+      return []
+
+    docs = [doc for doc in self.referenced_by.get(title, ()) if doc is not doc_def]
+    docs.sort(key = lambda doc: (doc.get_title(), doc.get_href()))
+    return docs
+
+  def get_dangling(self):
+    dangling = []
+
+    for group in self.session.lists:
+      for doc_def in group.doc_list:
+        for name, where, is_ref in self.edges[id(doc_def)]:
+          if is_ref and name not in self.session.href:
+            dangling.append((doc_def, name, where))
+
+    return dangling
+
+  def report_dangling(self, file = stderr):
+    dangling = self.get_dangling()
+
+    for doc_def, name, where in dangling:
+      file.write(f"docgen: {doc_def.get_title()}: {where} refers to {name}, which isn't documented\n")
+
+    return len(dangling)
@@ -0,0 +1,87 @@
+import io, mmap, locale
+
+from marker import Marker
+
+class Scanner:
+  DEF_START = Marker.DEF_START.encode()
+  DEF_END = Marker.DEF_END.encode()
+
+  def map_file(file):
+    try:
+      return mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    except ValueError:
+      # Empty files can't be mapped
+      return None
+
+  def get_line_start(data, pos):
+    return max(data.rfind(b'\n', 0, pos), data.rfind(b'\r', 0, pos)) + 1
+
+  def find_marker(data, marker, pos):
+    while True:
+      pos = data.find(marker, pos)
+      if pos == -1:
+        return -1, -1
+
+      # Only count markers that begin a line, like the line reader does
+      line_start = Scanner.get_line_start(data, pos)
+      if not data[line_start:pos].strip():
+        return line_start, pos
+
+      pos += len(marker)
+
+  def find_blocks(data):
+    pos = 0
+
+    while True:
+      start, pos = Scanner.find_marker(data, Scanner.DEF_START, pos)
+      if start == -1:
+        return
+
+      _, end = Scanner.find_marker(data, Scanner.DEF_END, pos + len(Scanner.DEF_START))
+      if end == -1:
+        yield start, len(data)
+        return
+
+      pos = end + len(Scanner.DEF_END)
+      yield start, pos
+
+  def read_lines(data, encoding = None):
+    encoding = encoding or locale.getpreferredencoding(False)
+    lines = []
+
+    for start, end in Scanner.find_blocks(data):
+      text = data[start:end].decode(encoding)
+      lines.extend(io.StringIO(text, newline = None))
+
+    return lines
+
+  def read_blocks(data, encoding = None):
+    encoding = encoding or locale.getpreferredencoding(False)
+    line = 1
+    pos = 0
+
+    # Yields each block's lines, with the line number it starts on
+    for start, end in Scanner.find_blocks(data):
+      line += data[pos:start].count(b'\n')
+      pos = start
+
+      text = data[start:end].decode(encoding)
+      yield line, list(io.StringIO(text, newline = None))
+
+  def scan_blocks(path):
+    with open(path, 'rb') as file:
+      data = Scanner.map_file(file)
+      if data is None:
+        return
+
+      with data:
+        yield from Scanner.read_blocks(data)
+
+  def scan_file(path):
+    with open(path, 'rb') as file:
+      data = Scanner.map_file(file)
+      if data is None:
+        return []
+
+      with data:
+        return Scanner.read_lines(data)
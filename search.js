@@ -0,0 +1,175 @@
+(function() {
+    var MAX_RESULTS = 50;
+
+    var index = window.DOCGEN_SEARCH_INDEX;
+    var decoded = {};
+
+    function decode(key, encoded) {
+        if (decoded[key])
+            return decoded[key];
+
+        var ids = [];
+        var id = 0;
+        for (var i = 0; i < encoded.length; i++) {
+            id += encoded[i];
+            ids.push(id);
+        }
+
+        decoded[key] = ids;
+        return ids;
+    }
+
+    function intersect(a, b) {
+        var result = [];
+        var i = 0, j = 0;
+        while (i < a.length && j < b.length) {
+            if (a[i] < b[j])
+                i++;
+            else if (a[i] > b[j])
+                j++;
+            else {
+                result.push(a[i]);
+                i++;
+                j++;
+            }
+        }
+        return result;
+    }
+
+    function findByName(term) {
+        var ids = null;
+
+        if (term.length < 3) {
+            ids = [];
+            for (var i = 0; i < index.docs.length; i++) {
+                if (index.docs[i][3].indexOf(term) !== -1)
+                    ids.push(i);
+            }
+            return ids;
+        }
+
+        for (var i = 0; i < term.length - 2; i++) {
+            var trigram = term.substr(i, 3);
+            var encoded = index.trigrams[trigram];
+            if (!encoded)
+                return [];
+
+            var postings = decode("t" + trigram, encoded);
+            ids = ids === null ? postings : intersect(ids, postings);
+            if (ids.length === 0)
+                return ids;
+        }
+
+        // Trigrams can match out of order, so check the actual text
+        return ids.filter(function(id) {
+            return index.docs[id][3].indexOf(term) !== -1;
+        });
+    }
+
+    function findByWord(term) {
+        var words = index.words;
+        var low = 0, high = words.length;
+
+        // Find the first word that starts with the term
+        while (low < high) {
+            var mid = (low + high) >> 1;
+            if (words[mid] < term)
+                low = mid + 1;
+            else
+                high = mid;
+        }
+
+        var ids = {};
+        for (var i = low; i < words.length && words[i].lastIndexOf(term, 0) === 0; i++) {
+            var postings = decode("w" + i, index.wordDocs[i]);
+            for (var j = 0; j < postings.length; j++)
+                ids[postings[j]] = true;
+        }
+        return ids;
+    }
+
+    function scoreName(doc, term) {
+        var title = doc[3].split(" ")[0];
+        if (title === term)
+            return 100;
+        if (title.length > term.length && title.substr(title.length - term.length - 1) === "." + term)
+            return 90;
+        if (title.lastIndexOf(term, 0) === 0)
+            return 80;
+        if (title.indexOf("." + term) !== -1)
+            return 70;
+        if (title.indexOf(term) !== -1)
+            return 50;
+        return 30;
+    }
+
+    function search(query) {
+        var terms = query.toLowerCase().split(/\s+/).filter(function(term) {
+            return term.length > 0;
+        });
+
+        if (terms.length === 0)
+            return [];
+
+        var scores = null;
+
+        for (var t = 0; t < terms.length; t++) {
+            var termScores = {};
+
+            var byName = findByName(terms[t]);
+            for (var i = 0; i < byName.length; i++)
+                termScores[byName[i]] = scoreName(index.docs[byName[i]], terms[t]);
+
+            var byWord = findByWord(terms[t]);
+            for (var id in byWord) {
+                if (!(id in termScores))
+                    termScores[id] = 10;
+            }
+
+            // Every term has to match somewhere
+            if (scores === null)
+                scores = termScores;
+            else {
+                var combined = {};
+                for (var id in scores) {
+                    if (id in termScores)
+                        combined[id] = scores[id] + termScores[id];
+                }
+                scores = combined;
+            }
+        }
+
+        var results = Object.keys(scores).map(Number);
+        results.sort(function(a, b) {
+            return (scores[b] - scores[a]) || (index.docs[a][0] < index.docs[b][0] ? -1 : 1);
+        });
+        return results.slice(0, MAX_RESULTS);
+    }
+
+    function render(results, list) {
+        list.innerHTML = "";
+
+        for (var i = 0; i < results.length; i++) {
+            var doc = index.docs[results[i]];
+
+            var item = document.createElement("li");
+            var link = document.createElement("a");
+            link.href = doc[1];
+            link.textContent = doc[0];
+            item.appendChild(link);
+            item.appendChild(document.createTextNode(" (" + index.types[doc[2]] + ")"));
+            list.appendChild(item);
+        }
+    }
+
+    window.docgenSearch = search;
+
+    var input = document.getElementById("docgen-search-input");
+    var list = document.getElementById("docgen-search-results");
+    if (!index || !input || !list)
+        return;
+
+    input.addEventListener("input", function() {
+        render(search(input.value), list);
+    });
+})();
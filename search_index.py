@@ -0,0 +1,126 @@
+import re, json
+
+from enums import DefType, defTypeNames
+from namespace_info import NamespaceInfo
+from writer import Writer
+
+class SearchIndex:
+  VERSION = 1
+  FILENAME = "search-index.js"
+  SCRIPT = "search.js"
+
+  WORD_PATTERN = re.compile(r'[a-z0-9_]{2,}')
+  TAG_PATTERN = re.compile(r'<[^>]*>')
+
+  STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "will", "with"
+  }
+
+  def __init__(self, session, describe = None):
+    self.session = session
+    self.describe = describe or Writer.process_description
+    self.docs = []
+    self.trigrams = {}
+    self.words = {}
+
+  def add_postings(postings, key, doc_id):
+    ids = postings.get(key)
+    if ids is None:
+      postings[key] = [doc_id]
+    elif ids[-1] != doc_id:
+      ids.append(doc_id)
+
+  def add_trigrams(self, text, doc_id):
+    for i in range(len(text) - 2):
+      SearchIndex.add_postings(self.trigrams, text[i:i + 3], doc_id)
+
+  def add_words(self, text, doc_id):
+    text = SearchIndex.TAG_PATTERN.sub(' ', text.lower())
+
+    for word in SearchIndex.WORD_PATTERN.findall(text):
+      if not word in SearchIndex.STOP_WORDS:
+        SearchIndex.add_postings(self.words, word, doc_id)
+
+  def add(self, title, href, type, namespace = None, labels = None, description = None):
+    doc_id = len(self.docs)
+
+    # Everything that can be found by name is matched through trigrams
+    names = title.lower()
+    if namespace:
+      names += " " + namespace.lower()
+    if labels:
+      names += " " + " ".join(labels).lower()
+
+    self.docs.append([title, self.session.get_link(href), type.value, names])
+    self.add_trigrams(names, doc_id)
+
+    if description:
+      self.add_words(self.describe(description, False, False, False), doc_id)
+
+  def add_doc(self, doc, type):
+    labels = None
+    if hasattr(doc, 'params'):
+      labels = [param.label for param in doc.params]
+
+    self.add(doc.get_title(), doc.get_href(), type, doc.namespace, labels, doc.description)
+
+  def build(session, get_docs, describe = None):
+    index = SearchIndex(session, describe)
+
+    # Sorted, since the order namespaces were first seen in changes while watching
+    for name in sorted(session.namespaces):
+      namespace_info = session.namespaces[name]
+      type = DefType.ENUM if namespace_info.is_enum_namespace else DefType.NAMESPACE
+      index.add(name, NamespaceInfo.get_href(name), type)
+
+    for type in DefType:
+      if Writer.can_write_docs(session, type):
+        for doc in get_docs(type):
+          index.add_doc(doc, type)
+
+    return index
+
+  def encode_postings(ids):
+    # Store gaps between ids, which are much shorter in JSON
+    previous = 0
+    encoded = []
+
+    for doc_id in ids:
+      encoded.append(doc_id - previous)
+      previous = doc_id
+
+    return encoded
+
+  def to_json(self):
+    words = sorted(self.words)
+
+    data = {
+      "version": SearchIndex.VERSION,
+      "types": [defTypeNames[type][1] for type in DefType],
+      "docs": self.docs,
+      "trigrams": {
+        trigram: SearchIndex.encode_postings(ids) for trigram, ids in self.trigrams.items()
+      },
+      "words": words,
+      "wordDocs": [SearchIndex.encode_postings(self.words[word]) for word in words]
+    }
+
+    return json.dumps(data, separators = (',', ':'), ensure_ascii = False)
+
+  def write_file(self, file):
+    # A script instead of plain JSON, so the reference also works from file://
+    file.write("window.DOCGEN_SEARCH_INDEX=")
+    file.write(self.to_json())
+    file.write(";\n")
+
+  def write(self, path):
+    with open(path / SearchIndex.FILENAME, 'w', encoding = 'utf-8') as file:
+      self.write_file(file)
+
+  def read_script(path):
+    try:
+      with open(path, 'r', encoding = 'utf-8') as file:
+        return file.read()
+    except FileNotFoundError:
+      return ""
@@ -0,0 +1,114 @@
+import os, json, fnmatch
+
+class Walker:
+  DEFAULT_EXTENSIONS = ['.cpp']
+  COMPILE_COMMANDS = "compile_commands.json"
+
+  def __init__(self, extensions = None, excludes = None):
+    self.extensions = tuple(extensions or Walker.DEFAULT_EXTENSIONS)
+    self.excludes = excludes or []
+
+  def is_excluded(self, name, relative_path):
+    for pattern in self.excludes:
+      if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern):
+        return True
+
+    return False
+
+  def walk(self, root, relative_root = ""):
+    try:
+      with os.scandir(root) as it:
+        entries = sorted(it, key = lambda entry: entry.name)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+      return
+
+    subdirs = []
+
+    for entry in entries:
+      # Hidden files and folders (.git and such) are never looked at
+      if entry.name.startswith('.'):
+        continue
+
+      relative_path = relative_root + entry.name
+      if self.is_excluded(entry.name, relative_path):
+        continue
+
+      if entry.is_dir():
+        subdirs.append((entry.path, relative_path + "/"))
+      elif entry.name.endswith(self.extensions):
+        yield entry.path
+
+    # Excluded folders were pruned above, so they're never opened
+    for path, relative_path in subdirs:
+      yield from self.walk(path, relative_path)
+
+  def get_relative_key(root, path):
+    # Sorts the same way walk() yields files: files first, then folders, by name
+    parts = os.path.relpath(path, root).split(os.sep)
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+  def is_walked(self, root, path):
+    parts = os.path.relpath(path, root).split(os.sep)
+    if parts[0] == '..':
+      return False
+
+    for i, part in enumerate(parts):
+      if part.startswith('.') or self.is_excluded(part, "/".join(parts[:i + 1])):
+        return False
+
+    return parts[-1].endswith(self.extensions)
+
+  def get_key(self, input_paths, path):
+    for input_index, root in enumerate(input_paths):
+      if os.path.isdir(root) and self.is_walked(root, path):
+        return (input_index, Walker.get_relative_key(root, path))
+
+    return None
+
+  def read_file_list(path):
+    with open(path) as file:
+      for line in file:
+        line = line.strip()
+        if line and not line.startswith('#'):
+          yield line
+
+  def read_compile_commands(path):
+    with open(path) as file:
+      commands = json.load(file)
+
+    seen = set()
+
+    for command in commands:
+      filename = os.path.join(command.get("directory", ""), command["file"])
+      if not filename in seen:
+        seen.add(filename)
+        yield filename
+
+  def find(self, input_paths):
+    for path in input_paths:
+      if path.startswith('@'):
+        filenames = Walker.read_file_list(path[1:])
+      elif os.path.basename(path) == Walker.COMPILE_COMMANDS:
+        filenames = Walker.read_compile_commands(path)
+      elif os.path.isdir(path):
+        yield from self.walk(path)
+        continue
+      else:
+        yield path
+        continue
+
+      for filename in filenames:
+        if not self.is_excluded(os.path.basename(filename), filename):
+          yield filename
+
+  def find_keyed(self, input_paths):
+    # Yields each path with a key that sorts in the same order as find()
+    for input_index, path in enumerate(input_paths):
+      if path.startswith('@') or os.path.basename(path) == Walker.COMPILE_COMMANDS:
+        for position, filename in enumerate(self.find([path])):
+          yield filename, (input_index, ((0, position),))
+      elif os.path.isdir(path):
+        for filename in self.walk(path):
+          yield filename, (input_index, Walker.get_relative_key(path, filename))
+      else:
+        yield path, (input_index,)
@@ -0,0 +1,307 @@
+import os, sys, time, errno, bisect, select, struct, ctypes, ctypes.util
+
+from sys import stderr
+from enums import DefType
+from doc_def import DocDef
+from namespace_info import NamespaceInfo
+from ref_graph import RefGraph
+
+class PollingWatcher:
+  def __init__(self, walker, input_paths, interval = 0.25):
+    self.walker = walker
+    self.input_paths = input_paths
+    self.interval = interval
+    self.stats = self.snapshot()
+
+  def snapshot(self):
+    stats = {}
+
+    for path in self.walker.find(self.input_paths):
+      try:
+        stat = os.stat(path)
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+      except OSError:
+        pass
+
+    return stats
+
+  def wait(self):
+    while True:
+      time.sleep(self.interval)
+
+      stats = self.snapshot()
+      changed = { path for path in stats if stats[path] != self.stats.get(path) }
+      changed.update(path for path in self.stats if not path in stats)
+      self.stats = stats
+
+      if changed:
+        return changed
+
+class InotifyWatcher:
+  IN_CLOSE_WRITE = 0x00000008
+  IN_MOVED_FROM = 0x00000040
+  IN_MOVED_TO = 0x00000080
+  IN_CREATE = 0x00000100
+  IN_DELETE = 0x00000200
+  IN_ISDIR = 0x40000000
+
+  EVENT_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+  EVENT_HEADER = struct.Struct("iIII")
+
+  # Editors often write a file in several steps, so wait for things to settle
+  SETTLE_TIME = 0.05
+
+  def load_libc():
+    if not sys.platform.startswith('linux'):
+      return None
+
+    try:
+      libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+      libc.inotify_init1
+      return libc
+    except (OSError, AttributeError):
+      return None
+
+  def __init__(self, libc, walker, input_paths):
+    self.libc = libc
+    self.walker = walker
+    self.input_paths = input_paths
+    self.roots = []
+    self.files = {}
+    self.folders = {}
+
+    self.fd = libc.inotify_init1(os.O_CLOEXEC)
+    if self.fd < 0:
+      raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    for path in input_paths:
+      if os.path.isdir(path):
+        self.roots.append(path)
+        self.add_tree(path)
+      else:
+        # Files listed directly (or through @lists) are watched through their folder
+        for filename in walker.find([path]):
+          full_path = os.path.abspath(filename)
+          self.files[full_path] = filename
+          self.add_watch(os.path.dirname(full_path))
+
+  def add_watch(self, path):
+    wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), InotifyWatcher.EVENT_MASK)
+    if wd >= 0:
+      self.folders[wd] = path
+
+  def add_tree(self, path):
+    self.add_watch(path)
+
+    try:
+      with os.scandir(path) as it:
+        for entry in it:
+          if entry.is_dir() and not entry.name.startswith('.'):
+            if not self.walker.is_excluded(entry.name, entry.path):
+              self.add_tree(entry.path)
+    except OSError:
+      pass
+
+  def get_input(self, path):
+    # Returns the path the way the walker spelled it, or None if it's not an input
+    filename = self.files.get(os.path.abspath(path))
+    if filename is not None:
+      return filename
+
+    for root in self.roots:
+      if self.walker.is_walked(root, path):
+        return path
+
+    return None
+
+  def read_events(self, changed):
+    try:
+      data = os.read(self.fd, 65536)
+    except OSError as error:
+      if error.errno == errno.EINTR:
+        return
+      raise
+
+    pos = 0
+
+    while pos < len(data):
+      wd, mask, _, length = InotifyWatcher.EVENT_HEADER.unpack_from(data, pos)
+      pos += InotifyWatcher.EVENT_HEADER.size
+      name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+      pos += length
+
+      folder = self.folders.get(wd)
+      if folder is None:
+        continue
+
+      path = os.path.join(folder, name)
+
+      if mask & InotifyWatcher.IN_ISDIR:
+        # Pick up new folders, and anything written into them before the watch existed
+        if mask & (InotifyWatcher.IN_CREATE | InotifyWatcher.IN_MOVED_TO):
+          self.add_tree(path)
+          changed.update(filter(self.get_input, self.walker.walk(path)))
+        continue
+
+      filename = self.get_input(path)
+      if filename is not None:
+        changed.add(filename)
+
+  def wait(self):
+    changed = set()
+
+    while not changed:
+      select.select([self.fd], [], [])
+      self.read_events(changed)
+
+    while select.select([self.fd], [], [], InotifyWatcher.SETTLE_TIME)[0]:
+      self.read_events(changed)
+
+    return changed
+
+class Watch:
+  def __init__(self, session, input_paths, walker, file_defs, parse_fn, regenerate_fn, use_polling = False):
+    self.session = session
+    self.input_paths = input_paths
+    self.walker = walker
+    self.file_defs = file_defs
+    self.parse_fn = parse_fn
+    self.regenerate_fn = regenerate_fn
+    self.file_keys = {}
+    self.keys = {}
+    self.titles = {}
+
+    # Definitions are kept in the order a full run would add them in
+    for path, key in walker.find_keyed(input_paths):
+      self.file_keys[path] = key
+
+    for path, doc_defs in file_defs.items():
+      self.set_keys(path, doc_defs)
+      for doc_def in doc_defs:
+        self.titles.setdefault(doc_def.get_title(), []).append(doc_def)
+
+    for docs in self.titles.values():
+      docs.sort(key = self.order)
+
+    self.watcher = None
+    if not use_polling:
+      libc = InotifyWatcher.load_libc()
+      if libc:
+        self.watcher = InotifyWatcher(libc, walker, input_paths)
+
+    if self.watcher is None:
+      self.watcher = PollingWatcher(walker, input_paths)
+
+  def order(self, doc_def):
+    return self.keys[id(doc_def)]
+
+  def set_keys(self, path, doc_defs):
+    file_key = self.file_keys[path]
+    for index, doc_def in enumerate(doc_defs):
+      self.keys[id(doc_def)] = (file_key, index)
+
+  def get_referenced(self, doc_def, namespaces, types):
+    # What a definition refers to lists it as "referenced by", so that output changes with it
+    for name in self.session.refs.get_names(doc_def):
+      for target in self.titles.get(name, []):
+        RefGraph.get_affected(target, namespaces, types, set())
+
+  def update_file(self, path, namespaces, types, titles):
+    for doc_def in self.file_defs.pop(path, []):
+      self.get_referenced(doc_def, namespaces, types)
+      DocDef.remove(self.session, doc_def, self.order)
+      self.titles[doc_def.get_title()].remove(doc_def)
+      del self.keys[id(doc_def)]
+      RefGraph.get_affected(doc_def, namespaces, types, titles)
+
+    if not os.path.isfile(path):
+      self.file_keys.pop(path, None)
+      return
+
+    if not path in self.file_keys:
+      key = self.walker.get_key(self.input_paths, path)
+      if key is None:
+        return
+      self.file_keys[path] = key
+
+    doc_defs = self.parse_fn(path)
+    self.file_defs[path] = doc_defs
+    self.set_keys(path, doc_defs)
+
+    for doc_def in doc_defs:
+      DocDef.add(self.session, doc_def, self.order)
+      bisect.insort(self.titles.setdefault(doc_def.get_title(), []), doc_def, key = self.order)
+      RefGraph.get_affected(doc_def, namespaces, types, titles)
+
+    for doc_def in doc_defs:
+      self.get_referenced(doc_def, namespaces, types)
+
+  def get_first_doc(self, namespace_info):
+    first = None
+
+    for docs in namespace_info.docs_per_def.values():
+      if docs and (first is None or self.order(docs[0]) < self.order(first)):
+        first = docs[0]
+
+    return first
+
+  def refresh_title(self, title):
+    # A full run lets the last definition with a title win, so find out which one that is now
+    writes = []
+
+    for doc_def in self.titles.get(title, []):
+      writes.append((self.order(doc_def), 0, doc_def.get_href()))
+
+    namespace_info = self.session.namespaces.get(title)
+    if namespace_info is not None:
+      first = self.get_first_doc(namespace_info)
+      writes.append((self.order(first), 1, NamespaceInfo.get_href(title)))
+
+      # Namespaces that start out as an enum prefix are listed as enums
+      namespace_info.is_enum_namespace = first.type == DefType.ENUM and first.namespace is None
+
+    if writes:
+      self.session.href[title] = max(writes)[2]
+    else:
+      self.session.href.pop(title, None)
+
+    descriptive = [doc_def for doc_def in self.titles.get(title, []) if DefType.is_descriptive(doc_def.type)]
+    if descriptive:
+      self.session.descriptions[title] = descriptive[-1]
+    else:
+      self.session.descriptions.pop(title, None)
+
+    if not self.titles.get(title, True):
+      del self.titles[title]
+
+  def update(self, paths):
+    namespaces = set()
+    types = set()
+    titles = set()
+
+    for path in sorted(paths):
+      try:
+        self.update_file(path, namespaces, types, titles)
+      except (OSError, UnicodeDecodeError) as error:
+        stderr.write(f"docgen: could not read {path}: {error}\n")
+
+    for title in titles:
+      self.refresh_title(title)
+
+    return namespaces, types
+
+  def run(self):
+    stderr.write("docgen: watching for changes (Ctrl+C to stop)\n")
+
+    try:
+      while True:
+        paths = self.watcher.wait()
+
+        start = time.perf_counter()
+        namespaces, types = self.update(paths)
+        self.regenerate_fn(namespaces, types)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        stderr.write(f"docgen: updated {len(paths)} file(s) in {elapsed:.0f} ms\n")
+    except KeyboardInterrupt:
+      pass
@@ -1,35 +1,31 @@
-import re
-
-import doc_globals
-
 from enums import DefType
-from parser import Parser
+from markup import Markup
 
 class Writer:
-  def can_write_docs(type):
-    if is_descriptive(type):
+  def can_write_docs(session, type):
+    if DefType.is_descriptive(type):
       return False
 
-    return doc_globals.lists[type.value].count > 0
+    return session.lists[type.value].count > 0
 
-  def can_write_namespace_link_list(type):
-    if DefType.is_field(type) or type == DefType.CONSTRUCTOR or is_descriptive(type):
+  def can_write_namespace_link_list(session, type):
+    if DefType.is_field(type) or type == DefType.CONSTRUCTOR or DefType.is_descriptive(type):
       return False
 
     if type == DefType.FUNCTION or type == DefType.METHOD or type == DefType.ENUM:
-      if len(doc_globals.lists[type.value].namespace_list) == 0:
+      if len(session.lists[type.value].namespace_list) == 0:
         return False
 
-    if len(doc_globals.lists[type.value].doc_list) == 0:
+    if len(session.lists[type.value].doc_list) == 0:
       return False
 
     return True
 
-  def can_write_namespace_contents_list(type):
-    if type == DefType.CONSTANT or type == DefType.GLOBAL_VAR or is_descriptive(type):
+  def can_write_namespace_contents_list(session, type):
+    if type == DefType.CONSTANT or type == DefType.GLOBAL_VAR or DefType.is_descriptive(type):
       return False
 
-    return Writer.can_write_namespace_link_list(type)
+    return Writer.can_write_namespace_link_list(session, type)
 
   def write_function_parameters(doc):
     parameter_index = 0
@@ -57,7 +53,7 @@ class Writer:
 
     return parameter_text
 
-  def process_description(input, is_doxygen = False, use_html_code = True, use_html_links = True):
+  def process_description(input, is_doxygen = False, use_html_code = True, use_html_links = True, session = None):
     if input is None:
       return None
 
@@ -65,17 +61,18 @@ class Writer:
       use_html_links = False
       use_html_code = False
 
-    output = input
+    # Text without links doesn't depend on the session, so it's rendered once for all of them
+    if not use_html_links:
+      session = None
 
-    # Replace backticks with <code>...</code> if using HTML
-    if use_html_code:
-      def convert_fn(match):
-        match = match.group(1)
-        return f"<code>{match}</code>"
+    return Markup.render(session, input, is_doxygen, use_html_code, use_html_links)
 
-      output = re.sub(r'`([^`]*)`', convert_fn, output)
+  def process_type(input, use_html_links = False, session = None):
+    if input is None:
+      return None
 
-    output = Parser.parse_ref(output, is_doxygen, use_html_links)
-    output = Parser.parse_param_ref(output, is_doxygen, use_html_links)
+    # Types only hold references, and share the tokens the reference graph was built from
+    if not use_html_links:
+      session = None
 
-    return output
+    return Markup.render(session, input, False, False, use_html_links)